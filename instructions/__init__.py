@@ -1,14 +1,35 @@
 from .version import __version__
-from .commands import *
-
-# commands package provides us with an API in it's __init__.py
-# file, i.e. which names of the package should be accessible by
-# the outer world. These same names should also be accessible
-# within the "instructions" namespace. One way to solve the problem
-# is to repeat all the imports in this file, but that violates DRY
-# principles, the other way is to make a star import. The thing
-# is that after a star import from the commands package we also
-# have all modules of the commands package in current namespace,
-# which is not what we want, so we have to delete them and clean
-# our namespace.
-del compounds, prototypes
+from .compat import py37
+from .index import Index
+from . import commands, sources
+from .commands import Command, find, first, last, exists, count, batch
+
+# Names of the commands package's API should also be accessible within the
+# "instructions" namespace. They are imported explicitly instead of a star
+# import, because the star import would produce all instructions upfront,
+# which is only done for Pythons without module level __getattr__ support
+API = commands.API + ['Index', 'sources']
+
+if not py37:
+    from .commands.compounds import *
+    __all__ = API + commands.compounds.__all__
+
+
+def __getattr__(name):
+    """
+    Produces instructions on first access, i.e. ``findstring__len``.
+    """
+    if name == '__all__':
+        globals()[name] = API + commands.compounds.get_names()
+        return globals()[name]
+
+    try:
+        globals()[name] = commands.compounds.get_instruction(name)
+    except AttributeError:
+        raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()).union(commands.compounds.get_names()))
@@ -2,7 +2,7 @@
 Commands's public API.
 """
 
-from .compounds import *
+from . import compounds
 from .prototypes import (
     Command,
     FindCommand as find,
@@ -11,3 +11,33 @@ from .prototypes import (
     ExistsCommand as exists,
     CountCommand as count
 )
+from .batches import Batch as batch
+from ..compat import py37
+
+API = ['Command', 'find', 'first', 'last', 'exists', 'count', 'batch']
+
+# Pythons without module level __getattr__ get all instructions upfront, others
+# produce them on first access and list them in __all__ only when it's asked for
+if not py37:
+    from .compounds import *
+    __all__ = API + compounds.__all__
+
+
+def __getattr__(name):
+    """
+    Produces instructions on first access, i.e. ``findstring__len``.
+    """
+    if name == '__all__':
+        globals()[name] = API + compounds.get_names()
+        return globals()[name]
+
+    try:
+        globals()[name] = compounds.get_instruction(name)
+    except AttributeError:
+        raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()).union(compounds.get_names()))
@@ -0,0 +1,123 @@
+"""
+Executes several commands during a single traversal of a searchable,
+exposed to the world as ``instructions.commands.batch()``.
+"""
+
+from __future__ import unicode_literals
+
+import collections
+
+from .prototypes import Command
+from ..compat import stringlike, itervalues
+from ..exceptions import CommandTypeError
+
+
+class Batch(object):
+    """
+    Batch walks a searchable only once and checks every visited object against
+    the conditions of all commands it was given, so that running many commands
+    over the same searchable costs roughly as much as running just one of them.
+    """
+    def __init__(self, commands):
+        """
+        :param commands: (required). Commands to execute.
+        :type commands: list or tuple
+        """
+        self.commands = tuple(commands)
+
+        if not all(isinstance(command, Command) for command in self.commands):
+            raise CommandTypeError
+
+    def inside(self, searchable):
+        """
+        Triggers the execution of all commands and returns a list with their results
+        in the same order as the commands were given. Each result is the same as the
+        one that would be returned by the command's ``inside()`` method.
+
+        :param iterable searchable: (required). An iterable data structure to be searched.
+        """
+        amount = len(self.commands)
+        found = [[] for _ in range(amount)]
+        done = [False] * amount
+        visited = [{id(searchable): (searchable, 0)} if command.dedupe else None for command in self.commands]
+        values = [command.dicts and command.indict == 'values' for command in self.commands]
+
+        def check(index, obj):
+            """
+            Checks an object against command's condition and returns whether the command is done.
+            """
+            if self.commands[index].predicate(obj):
+                found[index].append(obj)
+
+                if len(found[index]) == self.commands[index].limit:
+                    done[index] = True
+                    return True
+
+            return False
+
+        # The same stack based traversal as the one generated for a single command,
+        # except that each frame also holds indices of the commands that descended
+        # into the container, as ignore, level and indict options can differ, and
+        # depths the container was reached at before by commands which revisit it
+        stack = [(iter(searchable), None, tuple(range(amount)), {})]
+        remaining = amount
+
+        while stack and remaining:
+            items, container, active, before = stack[-1]
+
+            for obj in items:
+                iterable = isinstance(obj, collections.Iterable) and not isinstance(obj, stringlike)
+                into_values, into_items, seen = [], [], {}
+
+                for index in active:
+                    command = self.commands[index]
+
+                    if done[index] or type(obj) in command.ignore:
+                        continue
+
+                    if iterable:
+                        # Containers are searched again if reached at a shallower depth than
+                        # before, as they could be reached at the level limit first, objects
+                        # which were checked before aren't checked again, see make_traversal()
+                        if visited[index] is not None:
+                            if id(obj) in visited[index]:
+                                depth = visited[index][id(obj)][1]
+
+                                if not command.level or depth <= len(stack):
+                                    continue
+
+                                seen[index] = depth
+
+                            visited[index][id(obj)] = obj, len(stack)
+
+                        if command.level == 0 or command.level > len(stack):
+                            (into_values if values[index] and isinstance(obj, dict) else into_items).append(index)
+                            continue
+                    elif before.get(index, command.level) < command.level:
+                        continue
+
+                    remaining -= check(index, obj)
+
+                if not remaining:
+                    break
+
+                if into_values or into_items:
+                    if into_values:
+                        stack.append((itervalues(obj), obj, tuple(into_values),
+                                      dict((index, seen[index]) for index in into_values if index in seen)))
+
+                    if into_items:
+                        stack.append((iter(obj), obj, tuple(into_items),
+                                      dict((index, seen[index]) for index in into_items if index in seen)))
+
+                    break
+            else:
+                stack.pop()
+
+                if stack:
+                    for index in active:
+                        if not done[index] and index not in before:
+                            remaining -= check(index, container)
+
+        return [command._result(command.filter.locator.locate(iter(matches), command.bulk) if command.offsets
+                                else iter(matches)) for command, matches in zip(self.commands, found)]
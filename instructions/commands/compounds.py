@@ -1,36 +1,37 @@
 """
 Produces instructions in it's basic form, i.e. ``findstring__len(3)``.
+
+Instructions are created lazily on first access and then memoized in this
+module's namespace, so that importing the package doesn't have to produce
+every command, datatype and filter combination upfront.
 """
 
 from __future__ import unicode_literals
 
 from .prototypes import Command
+from ..compat import py37
 from ..filters import Filter
 from ..datatypes import DataType
 
 
-def make_instruction(for_filter):
+def make_instruction(command, filtr):
     """
-    Produces instruction in it's basic form.
-
-    Uses some global module variables defined in the end of the module.
+    Produces instruction in it's basic form. Keyword arguments which are not command's
+    options are passed to the filter, i.e. ``findstring__regex('foo', mode='match')``.
 
-    :param boolean for_filter: (required). Whether this instruction is for filter or datatype.
+    :param class command: (required). Command to use in instruction.
+    :param filtr: (required). Filter or datatype to use in instruction.
+    :type filtr: class or object
     """
-    command_name = command.__name__.lower().replace('command', '')
-    datatype_name = datatype.__name__.lower().replace('type', '')
+    if isinstance(filtr, type):
+        return lambda *args, **options: command(filtr(*args), **options)
 
-    if not for_filter:
-        filtr = datatype
-        instruction = '{0}{1}'.format(command_name, datatype_name)
-    else:
-        filtr = value
-        instruction = '{0}{1}__{2}'.format(command_name, datatype_name, name)
+    def instruction(*args, **kwargs):
+        options = dict((key, value) for key, value in kwargs.items() if key in command.known_options)
+        arguments = dict((key, value) for key, value in kwargs.items() if key not in command.known_options)
+        return command(filtr(*args, **arguments), **options)
 
-    # This is the place where magic happens, a new scope is created
-    # every time when a new lambda is produced, allowing to create a
-    # new instruction in the globals() dictionary
-    globals()[instruction] = (lambda c, f: lambda *args, **options: c(f(*args), **options))(command, filtr)
+    return instruction
 
 
 def get_classes(module, level, cls, ignore):
@@ -45,17 +46,78 @@ def get_classes(module, level, cls, ignore):
     names = __import__(module, globals(), level=level).__dict__.values()
     return [obj for obj in names if isinstance(obj, type) and issubclass(obj, cls) and obj.__name__ not in ignore]
 
-commands = get_classes('prototypes', 1, Command, ('Command',))
-datatypes = get_classes('datatypes', 2, DataType, ('DataType',))
 
-for command in commands:
-    for datatype in datatypes:
-        make_instruction(False)
-        for name, value in datatype.__dict__.items():
-            if isinstance(value, Filter):
-                make_instruction(True)
+def get_names():
+    """
+    Returns names of all available instructions.
+    """
+    names = []
+
+    for command_name in commands:
+        for datatype_name, datatype in datatypes.items():
+            names.append('{0}{1}'.format(command_name, datatype_name))
+            names.extend('{0}{1}__{2}'.format(command_name, datatype_name, name)
+                         for name, value in datatype.__dict__.items() if isinstance(value, Filter))
+
+    # Names are listed in __all__, which has to consist of native strings on Python 2
+    return [str(name) for name in names]
+
+
+def get_instruction(instruction):
+    """
+    Returns instruction by it's name, producing it if it wasn't produced yet.
+
+    :param string instruction: (required). Name of the instruction, i.e. ``findstring__len``.
+    """
+    prefix, _, name = instruction.partition('__')
+
+    for command_name, command in commands.items():
+        datatype = datatypes.get(prefix[len(command_name):]) if prefix.startswith(command_name) else None
+
+        if datatype is None:
+            continue
+
+        if not name:
+            filtr = datatype
+        elif isinstance(datatype.__dict__.get(name), Filter):
+            filtr = datatype.__dict__[name]
+        else:
+            break
+
+        if instruction not in globals():
+            globals()[instruction] = make_instruction(command, filtr)
+
+        return globals()[instruction]
+
+    raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, instruction))
+
+
+def __getattr__(name):
+    # Instructions are listed in __all__ only when it's asked for, i.e. by a star import
+    if name == '__all__':
+        globals()[name] = get_names()
+        return globals()[name]
+
+    return get_instruction(name)
+
+
+def __dir__():
+    return sorted(set(globals()).union(get_names()))
+
+
+commands = dict((command.__name__.lower().replace('command', ''), command)
+                for command in get_classes('prototypes', 1, Command, ('Command',)))
+datatypes = dict((datatype.__name__.lower().replace('type', ''), datatype)
+                 for datatype in get_classes('datatypes', 2, DataType, ('DataType',)))
+
+# Because this module should be used as from compounds import * we have to
+# make sure that only instructions are exported. Pythons without support for
+# module level __getattr__ can't produce instructions lazily, so they have to
+# get all of them upfront
+if not py37:
+    __all__ = get_names()
+
+    for name in __all__:
+        get_instruction(name)
 
-# Because this module should be used as from compounds import *
-# we have to clean current namespace of unnecessary variables
-del Filter, Command, DataType, make_instruction, get_classes, value
-del name, commands, datatypes, command, datatype, unicode_literals
+    del name
@@ -6,11 +6,17 @@ part cut out, i.e. ``instructions.commands.find()``.
 
 from __future__ import unicode_literals
 
+import array
 import itertools
 import collections
 
-from ..compat import stringlike, iterkeys, itervalues
+from ..index import Index
+from ..compat import load
 from ..filters import Filter
+from ..matchers import BUFFERS, VIEWS
+from ..predicates import Leaf, And, Branch, get_probe, reorder, eliminate, statistics
+from ..vectors import ITEMS, Vector
+from ..compiler import Matches, compile_condition, make_predicate, make_traversal, get_gate
 from ..exceptions import (
     FilterTypeError,
     CommandOptionError,
@@ -18,12 +24,30 @@ from ..exceptions import (
 )
 
 
+def rebuild(cls, filtr, options):
+    """
+    Creates a command from it's pickled description.
+
+    :param class cls: (required). Command's class.
+    :param filtr: (required). Filter to use while constructing result set.
+    :param dict options: (required). Command's options.
+    """
+    return cls(filtr, **options)
+
+
 class Command(object):
     """
     An abstract command implementation.
 
     All commands should inherit from this base class.
     """
+    ordered = True  #: whether results of parallel searches should be merged in order
+    bulk = False  #: whether the command needs only the amount of matches found inside arrays
+    known_options = frozenset([
+        'limit', 'level', 'ignore', 'indict', 'dedupe', 'workers', 'processes', 'executor', 'chunksize', 'optimize',
+        'adaptive', 'offsets'
+    ])  #: names of options the command accepts
+
     def __init__(self, filtr, **options):
         """
         :param filtr: (required). Filter to use while constructing result set.
@@ -33,6 +57,16 @@ class Command(object):
         :param ignore: (optional). What datatypes should be ignored while searching.
         :type ignore: list or tuple
         :param string indict: Whether to search in dict's keys or values.
+        :param boolean dedupe: (optional). Whether containers referenced several times should be searched only once.
+        :param integer workers: (optional). How many threads to use for searching top level items in parallel.
+        :param integer processes: (optional). How many processes to use for searching top level items in parallel.
+        :param executor: (optional). Executor to use for searching top level items in parallel.
+        :type executor: :class:`concurrent.futures.Executor`
+        :param integer chunksize: (optional). How many top level items to search in one parallel task.
+        :param boolean optimize: (optional). Whether cheaper parts of combined filters should be evaluated first.
+        :param boolean adaptive: (optional). Whether parts of combined filters should be reordered while searching.
+        :param boolean offsets: (optional). Whether offsets of filter's argument inside matching strings and bytes-like
+                                objects should be found instead of the objects.
         """
         if not isinstance(filtr, Filter):
             if isinstance(filtr, type) and issubclass(filtr, Filter):
@@ -40,21 +74,84 @@ class Command(object):
             else:
                 raise FilterTypeError
 
-        if filtr.datatype is not None:
-            names = filtr.datatype.names
-            condition = '{0} and {1}'.format(filtr.datatype.condition, filtr.condition)
+        datatype = filtr.datatype
+        adaptive = options.get('adaptive', False)
+        offsets = options.get('offsets', False)
+        tree = filtr.tree
+
+        # Objects are only checked for their type while searching for offsets, the filter's
+        # locator then finds offsets of it's argument inside each of them, in place, so that
+        # bytes-like buffers, which don't belong to any datatype, are searched as well
+        if offsets is True and filtr.locator is not None:
+            types = datatype.py if isinstance(datatype.py, tuple) else (datatype.py,)
+            tree = Leaf('isinstance(obj, _located)', {'_located': types + BUFFERS})
+            datatype = None
+        elif options.get('optimize', True):
+            tree = reorder(tree, datatype, statistics if adaptive else None)
+
+        # Operands of an adaptive filter are evaluated by the probe, which counts how
+        # selective they are and reorders them while the instruction is executed
+        if adaptive and isinstance(tree, Branch):
+            probe = get_probe(tree, datatype)
+            tree = Leaf('_probe(obj)', {'_probe': probe}, datatype)
         else:
-            names = {}
-            condition = filtr.condition
+            probe = None
+
+            # Filters of a single datatype can share subexpressions, i.e. obj.upper() is computed
+            # once for icontains('a') | icontains('b'), other filters are guarded by their datatypes
+            if datatype is not None:
+                tree = eliminate(tree, datatype)
+
+        if datatype is not None:
+            guard = Leaf(datatype.condition, datatype.names, datatype)
+            gate = get_gate(datatype)
+
+            # Objects of types that don't belong to the datatype are rejected by the type gate
+            # inside the traversal, so the type checks don't have to be evaluated there again
+            gated = [tree] if tree != guard else []
+
+            if datatype.spec is not None:
+                gated.insert(0, Leaf(datatype.spec[0], datatype.spec[1], datatype))
+
+            gated_condition = And.combine(*gated).render(datatype) if gated else 'True'
+            tree = And.combine(guard, tree)
+        else:
+            gate = None
+
+        condition = tree.render(datatype)
+        names = tree.namespace(datatype)
+
+        if datatype is None:
+            gated_condition = condition
 
         self.filter = filtr
+        self.options = options
+        self.dicts = filtr.datatype is None or filtr.datatype.py is not dict  #: whether indict applies to dicts
         self.raw_condition = condition
-        self.condition = compile(condition, '<string>', 'eval')
-        self.names = dict(names, **filtr.names)
+        self.condition = compile_condition(condition)
+        self.names = names
+        self.gate = gate
+
+        # The predicate checks objects the same way as the traversal does, so that NumPy
+        # scalars let in by the type gate match when objects are checked one by one too
+        if gate is not None:
+            self.predicate = make_predicate('_gate[type(obj)] and ({0})'.format(gated_condition),
+                                            dict(self.names, _gate=gate))
+        else:
+            self.predicate = make_predicate(condition, self.names)
         self.limit = options.get('limit', 0)
         self.level = options.get('level', 0)
         self.ignore = options.get('ignore', ())
         self.indict = options.get('indict', 'values')
+        self.dedupe = options.get('dedupe', False)
+        self.workers = options.get('workers', 0)
+        self.processes = options.get('processes', 0)
+        self.executor = options.get('executor', None)
+        self.chunksize = options.get('chunksize', 0)
+        self.optimize = options.get('optimize', True)
+        self.adaptive = adaptive
+        self.offsets = offsets
+        self.probe = probe
 
         if not isinstance(self.limit, int):
             raise CommandOptionTypeError('limit', 'int')
@@ -68,20 +165,183 @@ class Command(object):
         if self.indict not in ('keys', 'values'):
             raise CommandOptionError('indict', 'should be set to either "keys" or "values"')
 
+        if not isinstance(self.dedupe, bool):
+            raise CommandOptionTypeError('dedupe', 'bool')
+
+        if not isinstance(self.workers, int):
+            raise CommandOptionTypeError('workers', 'int')
+
+        if not isinstance(self.processes, int):
+            raise CommandOptionTypeError('processes', 'int')
+
+        if not isinstance(self.chunksize, int):
+            raise CommandOptionTypeError('chunksize', 'int')
+
+        if not isinstance(self.optimize, bool):
+            raise CommandOptionTypeError('optimize', 'bool')
+
+        if not isinstance(self.adaptive, bool):
+            raise CommandOptionTypeError('adaptive', 'bool')
+
+        if self.adaptive and not self.optimize:
+            raise CommandOptionError('adaptive', "can't be used together with optimize set to False")
+
+        if not isinstance(self.offsets, bool):
+            raise CommandOptionTypeError('offsets', 'bool')
+
+        if self.offsets and filtr.locator is None:
+            raise CommandOptionError('offsets', 'requires a filter which locates it\'s argument, i.e. "bytes.contains"')
+
+        if self.workers or self.processes or self.executor is not None:
+            futures = load('concurrent.futures')
+
+            if futures is None:
+                raise CommandOptionError('workers', 'requires "futures" package to be installed')
+
+            if self.processes and (self.workers or self.executor is not None):
+                raise CommandOptionError('processes', "can't be used together with workers or executor")
+
+            if self.executor is not None and not isinstance(self.executor, futures.Executor):
+                raise CommandOptionTypeError('executor', 'concurrent.futures.Executor')
+
+            # Visited containers can't be shared between parallel tasks
+            if self.dedupe:
+                raise CommandOptionError('dedupe', "can't be used together with workers, processes or executor")
+
+        # Bytes-like buffers are searched for offsets as a whole, not as iterables of bytes, while
+        # typed buffers are not searched inside for datatypes none of their items can belong to
+        if self.offsets:
+            prune = VIEWS
+        elif datatype is not None and not any(datatype.includes(type_) for type_ in ITEMS):
+            prune = (array.array,) + VIEWS
+        else:
+            prune = ()
+
+        # Elements of arrays of numbers are checked all at once, instead of being
+        # iterated over one by one, if arrays of their type belong to the datatype
+        if datatype is not None and datatype.kinds:
+            names = dict(filtr.names, **self.names)
+            vector = Vector(gated_condition, names, datatype.kinds, self.ignore, filtr.vector)
+        else:
+            vector = None
+
+        self.stats = {'pruned': 0}
+        self.traversal = make_traversal(
+            gated_condition,
+            self.names,
+            level=self.level,
+            ignore=self.ignore,
+            indict=self.indict,
+            dedupe=self.dedupe,
+            dicts=self.dicts,
+            gate=gate,
+            prune=prune,
+            vector=vector,
+            bulk=self.bulk
+        )
+
     def inside(self, searchable):
         """
         Triggers the command execution
 
         :param iterable searchable: (required). An iterable data structure to be searched.
         """
-        result = self._command(searchable)
+        if (self.workers or self.processes or self.executor is not None) and not isinstance(searchable, Index):
+            return self._merge(self._parallel(searchable))
+
+        return self._result(self._command(searchable))
+
+    def _parallel(self, searchable):
+        """
+        Splits top level items of the searchable into chunks, searches them in parallel and
+        yields results of every chunk. Results are yielded in the same order as the chunks,
+        unless the command is not ordered, then they are yielded as soon as they are ready.
+
+        :param iterable searchable: (required). An iterable data structure to be searched.
+        """
+        workers = self.workers or self.processes or load('multiprocessing').cpu_count()
+        executor = self.executor
+        futures = load('concurrent.futures')
+
+        if executor is None:
+            executor = futures.ProcessPoolExecutor(workers) if self.processes else futures.ThreadPoolExecutor(workers)
+
+        items = iter(searchable)
+        chunksize = self.chunksize
+
+        if not chunksize:
+            try:
+                chunksize = max(1, len(searchable) // (workers * 4))
+            except TypeError:
+                chunksize = 1000
+
+        # Only a limited amount of chunks is submitted ahead of the one whose results are
+        # being yielded, so that the searchable can be a lazy iterable of any size. Chunks
+        # that were not started yet are cancelled when the caller doesn't need more results
+        pending = collections.deque()
+
+        try:
+            while True:
+                chunk = list(itertools.islice(items, chunksize))
+
+                if chunk:
+                    pending.append(executor.submit(self._search, chunk))
+
+                if pending and (not chunk or len(pending) > workers * 2):
+                    if self.ordered:
+                        yield pending.popleft().result()
+                    else:
+                        for future in futures.wait(pending, return_when=futures.FIRST_COMPLETED).done:
+                            pending.remove(future)
+                            yield future.result()
+                elif not chunk:
+                    break
+        finally:
+            for future in pending:
+                future.cancel()
+
+            if self.executor is None:
+                executor.shutdown(wait=False)
+
+    def _search(self, chunk):
+        """
+        Searches a chunk of top level items and returns the chunk's result,
+        this is executed in parallel by workers.
 
+        :param list chunk: (required). Top level items to search.
+        """
+        return list(itertools.islice(self._command(chunk), self.limit or None))
+
+    def _merge(self, results):
+        """
+        Merges results of all chunks into the command's result.
+
+        :param iterator results: (required). Results of the chunks.
+        """
+        return self._result(itertools.chain.from_iterable(results))
+
+    def __reduce__(self):
+        """
+        Commands are pickled as the filter and the options they were created with, so
+        that they can be sent to worker processes and compiled there. Options which
+        enable parallel search are left out, as workers search their chunks by themselves.
+        """
+        options = dict((option, value) for option, value in self.options.items()
+                       if option not in ('workers', 'processes', 'executor'))
+        return rebuild, (self.__class__, self.filter, options)
+
+    def _result(self, matches):
+        """
+        Turns matches found by the command into the command's result.
+
+        :param iterator matches: (required). Matches found by the command.
+        """
         if self.limit == 0:
-            return result
+            return matches
         elif self.limit == 1:
-            return next(result, None)
+            return next(matches, None)
         else:
-            return itertools.islice(result, self.limit)
+            return itertools.islice(matches, self.limit)
 
     def _command(self, searchable):
         """
@@ -96,25 +356,16 @@ class FindCommand(Command):
 
     Find command returns it's results in the form of generator object to be memory efficient.
     """
-    def _command(self, searchable, _level=1):
-        for obj in searchable:
-            if type(obj) in self.ignore:
-                continue
-
-            if (
-                isinstance(obj, collections.Iterable) and
-                not isinstance(obj, stringlike) and
-                (self.level == 0 or self.level > _level)
-            ):
-                if self.filter.datatype.py is not dict and isinstance(obj, dict):
-                    obj = iterkeys(obj) if self.indict == 'keys' else itervalues(obj)
+    def _command(self, searchable):
+        if isinstance(searchable, Index):
+            matches = searchable.search(self)
+        else:
+            matches = self.traversal(searchable, self.stats)
 
-                for inner in self._command(obj, _level+1):
-                    yield inner
+        if self.offsets:
+            return self.filter.locator.locate(matches, self.bulk)
 
-            # This is where Python's code evaluation from filter takes place
-            if eval(self.condition, dict(locals(), **self.names)):
-                yield obj
+        return matches
 
 
 class FirstCommand(FindCommand):
@@ -129,6 +380,16 @@ class FirstCommand(FindCommand):
         :param ignore: (optional). Which datatypes should be ignored while searching.
         :type ignore: list or tuple
         :param string indict: Whether to search in dict's keys or values.
+        :param boolean dedupe: (optional). Whether containers referenced several times should be searched only once.
+        :param integer workers: (optional). How many threads to use for searching top level items in parallel.
+        :param integer processes: (optional). How many processes to use for searching top level items in parallel.
+        :param executor: (optional). Executor to use for searching top level items in parallel.
+        :type executor: :class:`concurrent.futures.Executor`
+        :param integer chunksize: (optional). How many top level items to search in one parallel task.
+        :param boolean optimize: (optional). Whether cheaper parts of combined filters should be evaluated first.
+        :param boolean adaptive: (optional). Whether parts of combined filters should be reordered while searching.
+        :param boolean offsets: (optional). Whether offsets of filter's argument inside matching strings and bytes-like
+                                objects should be found instead of the objects.
         """
         super(FirstCommand, self).__init__(*args, **kwargs)
         self.limit = 1
@@ -146,13 +407,26 @@ class LastCommand(FindCommand):
         :param ignore: (optional). Which datatypes should be ignored while searching.
         :type ignore: list or tuple
         :param string indict: Whether to search in dict's keys or values.
+        :param boolean dedupe: (optional). Whether containers referenced several times should be searched only once.
+        :param integer workers: (optional). How many threads to use for searching top level items in parallel.
+        :param integer processes: (optional). How many processes to use for searching top level items in parallel.
+        :param executor: (optional). Executor to use for searching top level items in parallel.
+        :type executor: :class:`concurrent.futures.Executor`
+        :param integer chunksize: (optional). How many top level items to search in one parallel task.
+        :param boolean optimize: (optional). Whether cheaper parts of combined filters should be evaluated first.
+        :param boolean adaptive: (optional). Whether parts of combined filters should be reordered while searching.
+        :param boolean offsets: (optional). Whether offsets of filter's argument inside matching strings and bytes-like
+                                objects should be found instead of the objects.
         """
         super(LastCommand, self).__init__(*args, **kwargs)
         self.limit = 0
 
-    def inside(self, *args, **kwargs):
+    def _search(self, chunk):
+        return list(collections.deque(self._command(chunk), maxlen=1))
+
+    def _result(self, matches):
         try:
-            return collections.deque(super(LastCommand, self).inside(*args, **kwargs), maxlen=1).pop()
+            return collections.deque(super(LastCommand, self)._result(matches), maxlen=1).pop()
         except IndexError:
             return None
 
@@ -161,20 +435,46 @@ class ExistsCommand(FirstCommand):
     """
     Exists command checks whether there is at least one result inside searchable.
     """
-    def inside(self, *args, **kwargs):
-        return True if super(ExistsCommand, self).inside(*args, **kwargs) is not None else False
+    ordered = False
+
+    def _search(self, chunk):
+        return self._result(self._command(chunk))
+
+    def _merge(self, results):
+        return any(results)
+
+    def _result(self, matches):
+        return True if super(ExistsCommand, self)._result(matches) is not None else False
 
 
 class CountCommand(FindCommand):
     """
     Count command counts how many results are there inside a searchable.
     """
-    def inside(self, *args, **kwargs):
-        result = super(CountCommand, self).inside(*args, **kwargs)
+    ordered = False
+    bulk = True
 
-        if result is None:
-            return 0
-        elif isinstance(result, collections.Iterator):
-            return sum(1 for _ in result)
-        else:
-            return 1
+    def _search(self, chunk):
+        return self._result(self._command(chunk))
+
+    def _merge(self, results):
+        total = 0
+
+        for result in results:
+            total += result
+
+            if self.limit and total >= self.limit:
+                return self.limit
+
+        return total
+
+    def _result(self, matches):
+        total = 0
+
+        for match in matches:
+            total += match.amount if isinstance(match, Matches) else 1
+
+            if self.limit and total >= self.limit:
+                return self.limit
+
+        return total
@@ -5,8 +5,15 @@ Python 2 and 3 compatibility layer.
 import sys
 import itertools
 
+try:
+    from collections import OrderedDict
+except ImportError:  # Python 2.6
+    OrderedDict = None
+
 py2 = sys.version_info[0] == 2
+py26 = sys.version_info < (2, 7)  # no memoryview
 py3 = sys.version_info[0] == 3
+py37 = sys.version_info >= (3, 7)  # module level __getattr__ and __dir__ support
 
 if py3:
     long = int
@@ -15,6 +22,8 @@ if py3:
     numeric = (int, float)
     stringlike = (str, bytes, bytearray)
 
+    from io import StringIO
+
     MAXSIZE = sys.maxsize
     zip_longest = itertools.zip_longest
 
@@ -33,6 +42,8 @@ elif py2:
     numeric = (int, float, long)
     stringlike = (unicode, bytes, bytearray)
 
+    from StringIO import StringIO  # io.StringIO rejects native strings
+
     class X(object):
         def __len__(self):
             return 1 << 31
@@ -56,6 +67,58 @@ elif py2:
         return iter(d.itervalues(**kwargs))
 
 
+if OrderedDict is None:
+    class OrderedDict(dict):
+        """Minimal ordered dict which remembers insertion order of keys, for Python 2.6."""
+        def __init__(self):
+            super(OrderedDict, self).__init__()
+            self._keys = []
+
+        def __setitem__(self, key, value):
+            if key not in self:
+                self._keys.append(key)
+
+            super(OrderedDict, self).__setitem__(key, value)
+
+        def pop(self, key, *default):
+            if key not in self:
+                return super(OrderedDict, self).pop(key, *default)
+
+            self._keys.remove(key)
+            return super(OrderedDict, self).pop(key)
+
+        def popitem(self, last=True):
+            if not self._keys:
+                raise KeyError('dictionary is empty')
+
+            key = self._keys.pop(-1 if last else 0)
+            return key, super(OrderedDict, self).pop(key)
+
+        def clear(self):
+            super(OrderedDict, self).clear()
+            del self._keys[:]
+
+# Optional dependencies and modules which are only needed to search in parallel, i.e. NumPy,
+# concurrent.futures or multiprocessing, are slow to import, so they are imported on first use
+optional = {}
+
+
+def load(name):
+    """Import an optional dependency on first use, return None if it's not installed."""
+    if name not in optional:
+        try:
+            optional[name] = __import__(name, fromlist=['__name__'])
+        except ImportError:
+            optional[name] = None
+
+    return optional[name]
+
+
+def loaded(name):
+    """Return a module if it was imported already, without importing it."""
+    return sys.modules.get(name)
+
+
 def with_metaclass(meta, *bases):
     """Create a base class with a metaclass."""
     class MetaClass(meta):
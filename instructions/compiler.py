@@ -0,0 +1,556 @@
+"""
+Turns textual filter conditions into real Python functions, so that commands
+don't have to go through eval() machinery for every object they visit. Whole
+traversals are generated here as well, specialized for every instruction.
+"""
+
+from __future__ import unicode_literals
+
+import tokenize
+import threading
+import collections
+
+from .compat import OrderedDict, StringIO, loaded, stringlike, iterkeys, itervalues
+
+CacheInfo = collections.namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class LRUCache(object):
+    """
+    A bounded cache which discards the least recently used items first.
+    """
+    def __init__(self, maxsize=256):
+        """
+        :param integer maxsize: (optional). Maximum amount of items to keep.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """
+        Returns an item stored under the key, creating it with the factory if it isn't cached yet.
+
+        :param key: (required). Hashable key of the item.
+        :param callable factory: (required). Creates the item if there is no such item in cache.
+        """
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items[key] = value
+                return value
+
+        value = factory()
+
+        with self._lock:
+            self._items[key] = value
+
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+        return value
+
+    def info(self):
+        """
+        Returns cache statistics.
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._items))
+
+    def clear(self):
+        """
+        Removes all items from cache and resets statistics.
+        """
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+
+cache = LRUCache()  #: compiled code objects and generated functions shared by all commands
+
+
+class TypeGate(dict):
+    """
+    Maps Python types to whether their objects are of a datatype, types which weren't
+    seen yet are checked against the datatype on first lookup and remembered, so that
+    objects of wrong types are rejected by a single dict lookup.
+
+    NumPy scalars are not subclasses of Python numbers, except for ``numpy.float64``, so the
+    gate lets them in by their dtype kind, if arrays of that kind belong to the datatype.
+
+    There is only one gate for every datatype, so gates are compared by identity.
+    """
+    def __init__(self, datatype):
+        """
+        :param class datatype: (required). Datatype to check types against.
+        """
+        super(TypeGate, self).__init__()
+        self.datatype = datatype
+
+    def __missing__(self, type_):
+        self[type_] = self.datatype.includes(type_) or self._scalar(type_)
+        return self[type_]
+
+    def _scalar(self, type_):
+        """
+        Returns whether the type is a NumPy scalar of a kind belonging to the datatype. NumPy is not
+        imported here, as there can't be any of it's scalars if it wasn't imported already.
+        """
+        numpy = loaded('numpy')
+        return numpy is not None and issubclass(type_, numpy.generic) and numpy.dtype(type_).kind in self.datatype.kinds
+
+    def __reduce__(self):
+        return get_gate, (self.datatype,)
+
+    # dict's comparison and hashing are replaced, but object has no __eq__ to borrow on Python 2
+    __hash__ = object.__hash__
+
+    def __eq__(self, other):
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
+
+
+gates = {}  #: type gates of all datatypes
+
+
+def get_gate(datatype):
+    """
+    Returns type gate for a datatype.
+
+    :param class datatype: (required). Datatype to return gate for.
+    """
+    try:
+        return gates[datatype]
+    except KeyError:
+        return gates.setdefault(datatype, TypeGate(datatype))
+
+
+class Matches(object):
+    """
+    Amount of matches found inside an array at once, traversals which are only used to count
+    matches yield it instead of the matches themselves, see :mod:`instructions.vectors`.
+    """
+    __slots__ = ('amount',)
+
+    def __init__(self, amount):
+        """
+        :param integer amount: (required). Amount of matches.
+        """
+        self.amount = amount
+
+
+# Subexpressions of datatypes' filters which don't have side effects, when several
+# filters are combined together, they are evaluated only once for every object
+SUBEXPRESSIONS = (
+    'obj.upper()',
+    'len(obj)',
+    'int(obj)',
+    'obj.replace(" ", "")',
+    'obj.replace(b" ", b"")',
+    'isinstance(obj, (bytes, bytearray))',
+)
+
+PREDICATE_TEMPLATE = '''
+def predicate(obj):
+    return {0}
+'''
+
+
+def compile_condition(condition):
+    """
+    Compiles a condition into a code object suitable for eval().
+
+    :param string condition: (required). Condition to compile.
+    """
+    return cache.get(('eval', condition), lambda: compile(condition, '<string>', 'eval'))
+
+
+def make_function(source, names, name):
+    """
+    Executes the source code and returns a function defined there. Functions are cached by
+    the source code and the names, so the same function is reused by different commands.
+
+    :param string source: (required). Source code which defines the function.
+    :param dict names: (required). Names used inside the source code.
+    :param string name: (required). Name of the function to return.
+    """
+    def factory():
+        namespace = dict(names)
+        exec(compile(source, '<instructions>', 'exec'), namespace)
+        return namespace[name]
+
+    # Types are part of the key because equal values of different types, e.g.
+    # 1 and True, are not interchangeable when the function is evaluated
+    try:
+        key = (source, frozenset((item, type(value), value) for item, value in names.items()))
+        hash(key)
+    except TypeError:
+        return factory()
+
+    return cache.get(key, factory)
+
+
+def make_predicate(condition, names):
+    """
+    Compiles a condition into a predicate function which takes an object and returns
+    the result of the condition evaluated against that object.
+
+    :param string condition: (required). Condition to compile.
+    :param dict names: (required). Names used inside the condition.
+    """
+    return make_function(PREDICATE_TEMPLATE.format(condition), names, 'predicate')
+
+
+def make_traversal(condition, names, level=0, ignore=(), indict='values', dicts=True, dedupe=False, gate=None,
+                   prune=(), vector=None, bulk=False):
+    """
+    Generates a traversal function specialized for one particular instruction. The function
+    takes a searchable and returns a generator which yields all objects matching the condition.
+    Options which are not in use don't make it into the generated code at all. The function
+    also takes an optional dict where it counts containers which contents were pruned, either
+    because they are of pruned types or because they were reached at the level limit.
+
+    :param string condition: (required). Condition to inline into the traversal.
+    :param dict names: (required). Names used inside the condition.
+    :param integer level: (optional). How deep inside nested iterable data structures to search.
+    :param ignore: (optional). What datatypes should be ignored while searching.
+    :type ignore: list or tuple
+    :param string indict: (optional). Whether to search in dict's keys or values.
+    :param boolean dicts: (optional). Whether dicts should be searched according to indict.
+    :param boolean dedupe: (optional). Whether containers should be visited only once.
+    :param gate: (optional). Type gate to check objects with before the condition.
+    :type gate: :class:`TypeGate`
+    :param tuple prune: (optional). Types of containers which contents can't match the condition.
+    :param vector: (optional). Vector to search arrays of numbers with, instead of iterating over them.
+    :type vector: :class:`instructions.vectors.Vector`
+    :param boolean bulk: (optional). Whether matches found by the vector should be yielded as their amount.
+    """
+    iterable = 'isinstance(obj, _Iterable) and not isinstance(obj, _stringlike)'
+
+    if gate is not None:
+        condition = '_gate[type(obj)] and ({0})'.format(condition)
+
+    depth = 'len(_stack) < {0}'.format(level)
+
+    # If the level is limited, a container can be reached at the limit first, where it isn't searched
+    # inside, and at a shallower depth later. So containers are remembered together with the depth they
+    # were reached at and are searched again when reached at a shallower one. Each frame also holds the
+    # depth it's container was reached at before, if it was, so that objects which were already checked
+    # before, including the container itself, aren't checked again, only containers are descended into
+    revisit = dedupe and level
+    frame = ', _seen[1]' if revisit else ''
+
+    # The traversal keeps an explicit stack of iterators instead of recursing into
+    # nested iterables, each frame also holds the container itself, because the
+    # container has to be checked after all of it's items are checked
+    lines = [
+        'def traverse(searchable, stats=None):',
+        '    _stack = [(iter(searchable), None{0})]'.format(', {0}'.format(level + 1) if revisit else ''),
+    ]
+
+    if prune or level:
+        lines += [
+            '    if stats is None:',
+            '        stats = {"pruned": 0}',
+        ]
+
+    # Visited containers are stored by their ids together with the containers
+    # themselves, otherwise a container could be garbage collected during the
+    # traversal and it's id reused by another container
+    if dedupe:
+        lines.append('    _visited = {{id(searchable): {0}}}'.format('(searchable, 0)' if revisit else 'searchable'))
+
+    lines += [
+        '    while _stack:',
+        '        _items, _container{0} = _stack[-1]'.format(', _before' if revisit else ''),
+        '        for obj in _items:',
+    ]
+
+    if ignore:
+        lines += [
+            '            if type(obj) in _ignore:',
+            '                continue',
+        ]
+
+    if revisit:
+        lines += [
+            '            if {0}:'.format(iterable),
+            '                _seen = _visited.get(id(obj), (None, {0}))'.format(level + 1),
+            '                if _seen[1] <= len(_stack):',
+            '                    continue',
+            '                _visited[id(obj)] = obj, len(_stack)',
+            '                if {0}:'.format(depth),
+        ]
+        indent = '                    '
+        boundary = '                '
+    elif dedupe:
+        lines += [
+            '            if {0}:'.format(iterable),
+            '                if id(obj) in _visited:',
+            '                    continue',
+            '                _visited[id(obj)] = obj',
+        ]
+        indent = '                '
+    elif level:
+        lines += [
+            '            if {0}:'.format(iterable),
+            '                if {0}:'.format(depth),
+        ]
+        indent = '                    '
+        boundary = '                '
+    else:
+        lines.append('            if {0}:'.format(iterable))
+        indent = '                '
+
+    if dicts:
+        push = [
+            'if isinstance(obj, _dict):',
+            '    _stack.append(({0}(obj), obj{1}))'.format('_iterkeys' if indict == 'keys' else '_itervalues', frame),
+            'else:',
+            '    _stack.append((iter(obj), obj{0}))'.format(frame),
+            'break',
+        ]
+    else:
+        push = [
+            '_stack.append((iter(obj), obj{0}))'.format(frame),
+            'break',
+        ]
+
+    # Pruned containers are not descended into, but they are still checked
+    # against the condition themselves, just as any other object
+    if prune:
+        push = [
+            'if isinstance(obj, _prune):',
+            '    stats["pruned"] += 1',
+            'else:',
+        ] + ['    ' + line for line in push]
+
+    # Arrays searched by the vector are not descended into either, if the level is
+    # limited, the vector checks that all of the array's dimensions are within it
+    if vector is not None:
+        if bulk:
+            found = [
+                'elif len(_matches):',
+                '    yield _Matches(len(_matches))',
+            ]
+        else:
+            found = [
+                'else:',
+                '    for _match in _matches:',
+                '        yield _match',
+            ]
+
+        push = [
+            '_matches = _vector(obj{0}) if _arrays[type(obj)] else None'.format(
+                ', {0} - len(_stack)'.format(level) if level else ''),
+            'if _matches is None:',
+        ] + ['    ' + line for line in push] + found
+
+    lines += [indent + line for line in push]
+
+    # Containers reached at the level limit are not descended into, they are counted as pruned too
+    if level:
+        lines += [
+            boundary + 'else:',
+            boundary + '    stats["pruned"] += 1',
+        ]
+
+    if revisit:
+        lines += [
+            '                if _seen[1] <= {0}:'.format(level),
+            '                    continue',
+            '            elif _before < {0}:'.format(level),
+            '                continue',
+        ]
+
+    lines += [
+        '            if {0}:'.format(condition),
+        '                yield obj',
+        '        else:',
+        '            _stack.pop()',
+        '            if _stack{0}:'.format(' and _before > {0}'.format(level) if revisit else ''),
+        '                obj = _container',
+        '                if {0}:'.format(condition),
+        '                    yield obj',
+    ]
+
+    return make_function('\n'.join(lines), dict(
+        names,
+        _Iterable=collections.Iterable,
+        _stringlike=stringlike,
+        _dict=dict,
+        _iterkeys=iterkeys,
+        _itervalues=itervalues,
+        _ignore=frozenset(ignore),
+        _gate=gate,
+        _prune=tuple(prune),
+        _vector=vector,
+        _arrays=vector.types if vector is not None else None,
+        _Matches=Matches
+    ), 'traverse')
+
+
+def get_tokens(source):
+    """
+    Returns a list of tokens of a single line of source code as tuples of token's string and
+    columns where it starts and ends, or None if the source can't be tokenized.
+
+    :param string source: (required). Source code to tokenize.
+    """
+    def factory():
+        try:
+            tokens = list(tokenize.generate_tokens(StringIO(source).readline))
+        except (tokenize.TokenError, SyntaxError):
+            return None
+
+        ignore = (tokenize.NEWLINE, tokenize.NL, tokenize.ENDMARKER)
+
+        if any(token[2][0] != 1 for token in tokens if token[0] not in ignore):
+            return None
+
+        return tuple((token[1], token[2][1], token[3][1]) for token in tokens if token[0] not in ignore)
+
+    return cache.get(('tokens', source), factory)
+
+
+def find_subexpressions(condition):
+    """
+    Returns a list of subexpressions found inside a condition as tuples of the subexpression
+    and columns where it starts and ends. Subexpressions are matched by tokens, so they are
+    never found inside strings or as a part of other names, i.e. ``foo.len(obj)``.
+
+    :param string condition: (required). Condition to inspect.
+    """
+    tokens = get_tokens(condition)
+    found = []
+
+    if tokens is None:
+        return found
+
+    strings = [token[0] for token in tokens]
+
+    for subexpression in SUBEXPRESSIONS:
+        pattern = [token[0] for token in get_tokens(subexpression)]
+
+        for index in range(len(tokens) - len(pattern) + 1):
+            if strings[index:index + len(pattern)] == pattern and (index == 0 or strings[index - 1] != '.'):
+                found.append((subexpression, tokens[index][1], tokens[index + len(pattern) - 1][2]))
+
+    return sorted(found, key=lambda item: item[1])
+
+
+# Tokens after which the rest of an expression may be not evaluated, and tokens of expressions
+# which may skip any of their parts, i.e. conditional expressions or comprehensions
+SHORT_CIRCUITS = ('and', 'or')
+CONDITIONALS = ('if', 'for', 'lambda')
+COMPARISONS = ('<', '>', '==', '!=', '<>', '<=', '>=', 'in', 'is')
+
+
+def is_unconditional(condition, column):
+    """
+    Returns whether the part of a condition starting at the column is always evaluated when
+    the condition is. It's not if any of the brackets around it, or the condition itself,
+    contain a conditional expression, a comprehension or a lambda, or if the part follows
+    a short-circuiting operator or a comparison in a chain of comparisons there.
+
+    :param string condition: (required). Condition to inspect.
+    :param integer column: (required). Column where the part starts.
+    """
+    tokens = get_tokens(condition)
+
+    if tokens is None:
+        return False
+
+    groups = []
+    stack = [None]
+    enclosing = ()
+
+    for index, (string, start, _) in enumerate(tokens):
+        if string in (')', ']', '}'):
+            stack.pop()
+
+        groups.append(stack[-1])
+
+        if start == column:
+            enclosing = set(stack)
+
+        if string in ('(', '[', '{'):
+            stack.append(index)
+
+    if not enclosing:
+        return False
+
+    for group in enclosing:
+        level = [(string, start) for (string, start, _), own in zip(tokens, groups) if own == group]
+        before = [string for string, start in level if start < column]
+
+        if any(string in CONDITIONALS for string, _ in level) or \
+                any(string in SHORT_CIRCUITS for string in before) or \
+                sum(string in COMPARISONS for string in before) > 1:
+            return False
+
+    return True
+
+
+def make_check(operands, conjunction, names):
+    """
+    Compiles operands of a logical operator into a function which takes an object and
+    evaluates operands against it one by one. Subexpressions repeated in several operands
+    are evaluated once, right before the first operand which always evaluates them, so
+    they are never evaluated for objects which operands guard from them. Returns None if
+    there are no repeated subexpressions.
+
+    :param list operands: (required). Conditions of operands.
+    :param boolean conjunction: (required). Whether the operator is AND or OR.
+    :param dict names: (required). Names used inside the conditions.
+    """
+    found = [find_subexpressions(operand) for operand in operands]
+    first = {}
+
+    for index, (operand, subexpressions) in enumerate(zip(operands, found)):
+        for subexpression, start, _ in subexpressions:
+            if subexpression not in first and is_unconditional(operand, start):
+                first[subexpression] = index
+
+    counts = collections.defaultdict(int)
+
+    for index, subexpressions in enumerate(found):
+        for subexpression, _, _ in subexpressions:
+            if first.get(subexpression, len(operands)) <= index:
+                counts[subexpression] += 1
+
+    common = dict((subexpression, '_common{0}'.format(number))
+                  for number, subexpression in enumerate(SUBEXPRESSIONS) if counts[subexpression] > 1)
+
+    if not common:
+        return None
+
+    lines = ['def check(obj):']
+    assigned = set()
+
+    for index, (operand, subexpressions) in enumerate(zip(operands, found)):
+        shared = [subexpression for subexpression in common if first[subexpression] <= index]
+
+        for subexpression, start, end in reversed(subexpressions):
+            if subexpression in shared:
+                operand = operand[:start] + common[subexpression] + operand[end:]
+
+        for subexpression, _, _ in subexpressions:
+            if subexpression in shared and subexpression not in assigned:
+                lines.append('    {0} = {1}'.format(common[subexpression], subexpression))
+                assigned.add(subexpression)
+
+        lines += [
+            '    if {0}({1}):'.format('not ' if conjunction else '', operand),
+            '        return {0}'.format(not conjunction),
+        ]
+
+    lines.append('    return {0}'.format(conjunction))
+    return make_function('\n'.join(lines), names, 'check')
@@ -6,12 +6,12 @@ cut out, i.e. ``instructions.datatypes.string()``.
 
 from __future__ import unicode_literals
 
-import copy
 import collections
 import itertools as it
 
 from ..compat import unicode, string, stringlike, long, numeric, with_metaclass, itervalues, MAXSIZE
-from ..filters import Filter, AugmentedFilter
+from ..filters import Filter, AugmentedFilter, augment
+from ..matchers import Pattern
 from ..exceptions import DataTypeInitializationError
 
 
@@ -39,6 +39,7 @@ class DataTypeMeta(type):
 
         cls.datatype = cls
         cls.condition = 'isinstance(obj, ({0},))'.format(', '.join(cls.names.keys()))
+        cls.vector = '_whole(obj)' if cls.kinds else None
 
         if cls.pyex is not None:
             if isinstance(cls.pyex, tuple):
@@ -61,35 +62,49 @@ class DataTypeMeta(type):
         # some things with them to correctly prepare them for usage inside current datatype
         for item, value in it.chain(it.chain.from_iterable(base.__dict__.items() for base in bases), dct.items()):
             if isinstance(value, Filter):
-                filtr = copy.copy(value)
+                filtr = value
 
                 if (
                     filtr.datatype is not None and
                     filtr.datatype.py in filtr.accept_types and
                     filtr.datatype.py != cls.py
                 ):
-                    filtr.accept_types = (getattr(cls, 'accept_types', cls.py),)
+                    filtr = filtr._replace(accept_types=(getattr(cls, 'accept_types', cls.py),))
 
                 # If a datatype contains AugmentedFilters, we should
                 # apply cls.augmentation on them or clean them from it
                 if isinstance(filtr, AugmentedFilter):
                     try:
                         if not filtr.is_augmented:
-                            filtr.condition = filtr.raw_condition.replace('{0}', cls.augmentation)
-                            filtr.org_condition = filtr.raw_condition
-                            filtr.raw_condition = filtr.condition
-                            filtr.is_augmented = True
+                            condition = augment(filtr.raw_condition, cls.augmentation)
+                            filtr = filtr._replace(
+                                condition=condition,
+                                org_condition=filtr.raw_condition,
+                                raw_condition=condition,
+                                is_augmented=True
+                            )
                         elif cls.augmentation is None:
-                            filtr = Filter(filtr.org_condition, filtr.names, filtr.accept_types)
+                            filtr = Filter(filtr.org_condition, filtr.names, filtr.accept_types, filtr.cost,
+                                           locate=filtr.locate)
                         elif cls.augmentation != filtr.datatype.augmentation:
-                            filtr.condition = filtr.org_condition.replace('{0}', cls.augmentation)
-                            filtr.raw_condition = filtr.condition
+                            condition = augment(filtr.org_condition, cls.augmentation)
+                            filtr = filtr._replace(condition=condition, raw_condition=condition)
                     except AttributeError:
                         raise DataTypeInitializationError(
                             name, '"augmentation" attribute is not set, while class contains augmented filters')
 
-                filtr.datatype = cls
-                setattr(cls, item, filtr)
+                setattr(cls, item, filtr._replace(datatype=cls))
+
+    def includes(cls, type_):
+        """
+        Returns whether objects of the given Python type are of this datatype.
+
+        :param class type_: (required). Python type to check.
+        """
+        if cls.pyex is not None:
+            return issubclass(type_, cls.py) and not issubclass(type_, cls.pyex)
+        else:
+            return issubclass(type_, cls.py)
 
     def __instancecheck__(cls, obj):
         """
@@ -110,6 +125,7 @@ class DataType(with_metaclass(DataTypeMeta, Filter)):
     py = None    #: A type or tuple of types that this datatype will operate on.
     pyex = None  #: A type or tuple of types to exclude from this datatype.
     spec = None  #: A string of Python code that specifies additional datatype behaviour if any.
+    kinds = ''   #: NumPy dtype kinds of arrays which elements are of this datatype, i.e. ``'iu'``.
 
     exact = Filter('obj == {0}')
 
@@ -129,18 +145,20 @@ class StringType(DataType):
     String datatype implementation.
     """
     py = stringlike
-    augmentation = '({0}.encode("utf-8") if isinstance(obj, (bytes, bytearray)) else {0})'
-
-    exact = AugmentedFilter('obj == {0}', accept_types=(stringlike,))
-    iexact = AugmentedFilter('obj.upper() == {0}.upper()', accept_types=(stringlike,))
-    contains = AugmentedFilter('{0} in obj', accept_types=(stringlike,))
-    icontains = AugmentedFilter('{0}.upper() in obj.upper()', accept_types=(stringlike,))
-    startswith = AugmentedFilter('obj.startswith({0}, **{kwargs})', accept_types=(stringlike,))
-    istartswith = AugmentedFilter('obj.upper().startswith({0}.upper(), **{kwargs})', accept_types=(stringlike,))
-    endswith = AugmentedFilter('obj.endswith({0}, **{kwargs})', accept_types=(stringlike,))
-    iendswith = AugmentedFilter('obj.upper().endswith({0}.upper(), **{kwargs})', accept_types=(stringlike,))
-    regex = None
-    iregex = None
+    augmentation = '({0.encoded} if isinstance(obj, (bytes, bytearray)) else {0.decoded})'
+
+    exact = AugmentedFilter('obj == {0}', accept_types=(stringlike,), locate='exact')
+    iexact = AugmentedFilter('obj.upper() == {0.upper}', accept_types=(stringlike,))
+    contains = AugmentedFilter('{0} in obj', accept_types=(stringlike,), locate='contains')
+    icontains = AugmentedFilter('{0.upper} in obj.upper()', accept_types=(stringlike,))
+    startswith = AugmentedFilter('obj.startswith({0}, **{kwargs})', accept_types=(stringlike,), locate='startswith')
+    istartswith = AugmentedFilter('obj.upper().startswith({0.upper}, **{kwargs})', accept_types=(stringlike,))
+    endswith = AugmentedFilter('obj.endswith({0}, **{kwargs})', accept_types=(stringlike,), locate='endswith')
+    iendswith = AugmentedFilter('obj.upper().endswith({0.upper}, **{kwargs})', accept_types=(stringlike,))
+    contains_any = Filter('{0.automaton}(obj)', accept_types=((list, tuple, set),))
+    icontains_any = Filter('{0.upper.automaton}(obj.upper())', accept_types=((list, tuple, set),))
+    regex = Filter('{0.regex}(obj)', accept_types=(stringlike + (Pattern,),))
+    iregex = Filter('{0.iregex}(obj)', accept_types=(stringlike + (Pattern,),))
     len = Filter('len(obj) == {0}', accept_types=(int,))
     lenlt = Filter('len(obj) < {0}', accept_types=(int,))
     lenlte = Filter('len(obj) <= {0}', accept_types=(int,))
@@ -194,17 +212,18 @@ class NumericType(DataType):
     """
     py = numeric
     pyex = bool
+    kinds = 'iuf'
     accept_types = (numeric,)
 
-    gt = Filter('obj > {0}', accept_types=(numeric,))
-    gte = Filter('obj >= {0}', accept_types=(numeric,))
-    lt = Filter('obj < {0}', accept_types=(numeric,))
-    lte = Filter('obj <= {0}', accept_types=(numeric,))
-    between = Filter('{0} <= obj <= {1}', accept_types=(numeric,))
-    ebetween = Filter('{0} < obj < {1}', accept_types=(numeric,))
-    isodd = Filter('int(obj) % 2 != 0')
-    iseven = Filter('int(obj) % 2 == 0')
-    divisibleby = Filter('int(obj) % {0} == 0', accept_types=(numeric,))
+    gt = Filter('obj > {0}', accept_types=(numeric,), vector='obj > {0}')
+    gte = Filter('obj >= {0}', accept_types=(numeric,), vector='obj >= {0}')
+    lt = Filter('obj < {0}', accept_types=(numeric,), vector='obj < {0}')
+    lte = Filter('obj <= {0}', accept_types=(numeric,), vector='obj <= {0}')
+    between = Filter('{0} <= obj <= {1}', accept_types=(numeric,), vector='({0} <= obj) & (obj <= {1})')
+    ebetween = Filter('{0} < obj < {1}', accept_types=(numeric,), vector='({0} < obj) & (obj < {1})')
+    isodd = Filter('int(obj) % 2 != 0', vector='_integral(obj) % 2 == 1')
+    iseven = Filter('int(obj) % 2 == 0', vector='_integral(obj) % 2 == 0')
+    divisibleby = Filter('int(obj) % {0} == 0', accept_types=(numeric,), vector='_remainder(_integral(obj), {0}) == 0')
 
 
 class IntType(NumericType):
@@ -212,6 +231,7 @@ class IntType(NumericType):
     Int datatype implementation.
     """
     py = int
+    kinds = 'iu'
 
 
 class FloatType(NumericType):
@@ -220,6 +240,7 @@ class FloatType(NumericType):
     """
     py = float
     pyex = None
+    kinds = 'f'
 
     isinteger = Filter('obj.is_integer()')
 
@@ -230,6 +251,7 @@ class LongType(NumericType):
     """
     py = long
     spec = ('obj > MAXSIZE', {'MAXSIZE': MAXSIZE})
+    kinds = ''
 
 
 class ComplexType(DataType):
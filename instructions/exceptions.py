@@ -30,6 +30,15 @@ class FilterUsageError(InstructionsError):
         super(FilterUsageError, self).__init__('Incorrect usage of filter: {0}'.format(reason))
 
 
+class FilterImmutableError(InstructionsError, AttributeError):
+    """
+    Filter can't be changed after it was created.
+    """
+    def __init__(self, attribute):
+        super(FilterImmutableError, self).__init__('Filter is immutable, "{0}" attribute can\'t be changed'.format(
+            attribute))
+
+
 class FilterTypeError(InstructionsError, TypeError):
     """
     Provided filter should be of Filter type.
@@ -47,6 +56,14 @@ class DataTypeInitializationError(InstructionsError):
             "{0} class can't be initialized because {1}".format(cls, reason))
 
 
+class CommandTypeError(InstructionsError, TypeError):
+    """
+    Provided command should be of Command type.
+    """
+    def __init__(self):
+        super(CommandTypeError, self).__init__('Provided command should be of Command type')
+
+
 class CommandOptionError(InstructionsError):
     """
     Command option error.
@@ -61,3 +78,12 @@ class CommandOptionTypeError(InstructionsError, TypeError):
     """
     def __init__(self, option, type_):
         super(CommandOptionTypeError, self).__init__('{0} option should be of "{1}" type'.format(option, type_))
+
+
+class SourceDecodeError(InstructionsError, ValueError):
+    """
+    Source can't be decoded.
+    """
+    def __init__(self, reason, position):
+        super(SourceDecodeError, self).__init__("Source can't be decoded at position {0}: {1}".format(
+            position, reason))
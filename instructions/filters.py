@@ -5,42 +5,193 @@ Defines all filters used across the project.
 from __future__ import unicode_literals
 
 import re
+import copy
 
-from .compat import string, zip_longest
-from .exceptions import FilterImplementationError, FilterUsageError
+from .compat import loaded, string, unicode, stringlike, zip_longest
+from .matchers import MODES, LOCATIONS, Locator, get_automaton, get_regex
+from .predicates import Leaf, And, Or, Not
+from .exceptions import FilterImplementationError, FilterUsageError, FilterImmutableError
+
+
+class Argument(object):
+    """
+    Wraps an argument of a filter, so that filter's condition can refer both to the argument
+    and to it's transformed forms, i.e. ``{0.upper}``. Transformations are applied once, when
+    the filter is called, and their results are put into the condition as constants, so they
+    don't have to be applied again for every object the condition is evaluated against.
+
+    Forms which can't be written as constants, i.e. ``{0.automaton}``, are put into the
+    condition as names, values of those names are collected into the names dict.
+    """
+    def __init__(self, value, names=None, options=None, literal=True):
+        """
+        :param value: (required). Value of the argument.
+        :param dict names: (optional). Dict to collect names used by the condition into.
+        :param dict options: (optional). Keyword arguments the filter was called with.
+        :param boolean literal: (optional). Whether the value can be written as a constant.
+        """
+        self.value = value
+        self.names = names if names is not None else {}
+        self.options = options or {}
+        self.literal = literal
+
+    def __format__(self, spec):
+        if self.literal:
+            # NumPy scalars are written as Python numbers, their reprs aren't valid without NumPy's names.
+            # There can't be any if NumPy wasn't imported yet, so it's not imported here just to check
+            numpy = loaded('numpy')
+
+            if numpy is not None and isinstance(self.value, numpy.generic):
+                return repr(self.value.item())
+
+            return repr(self.value)
+
+        # Values are named by their ids, so different values used by several
+        # combined filters never clash, while the same value gets the same name
+        name = '_{0}{1:x}'.format(type(self.value).__name__.lower(), id(self.value))
+        self.names[name] = self.value
+        return name
+
+    @property
+    def upper(self):
+        """
+        Uppercased argument or uppercased items of the argument, if it's a collection.
+        """
+        if isinstance(self.value, (list, tuple, set, frozenset)):
+            return Argument(type(self.value)(item.upper() for item in self.value), self.names, self.options)
+
+        return Argument(self.value.upper(), self.names, self.options)
+
+    @property
+    def encoded(self):
+        """
+        Argument encoded into bytes using UTF-8, if it's a text.
+        """
+        value = self.value.encode('utf-8') if isinstance(self.value, unicode) else self.value
+        return Argument(value, self.names, self.options)
+
+    @property
+    def decoded(self):
+        """
+        Argument decoded from bytes using UTF-8, if it's bytes which are a valid UTF-8.
+        """
+        if isinstance(self.value, (bytes, bytearray)) and not isinstance(self.value, unicode):
+            try:
+                return Argument(self.value.decode('utf-8'), self.names, self.options)
+            except UnicodeDecodeError:
+                pass
+
+        return self
+
+    @property
+    def automaton(self):
+        """
+        Automaton which checks whether a string contains any of the argument's items.
+        """
+        if not all(isinstance(item, stringlike) for item in self.value):
+            raise FilterUsageError('"{0}" argument should contain only strings'.format(self.value))
+
+        return Argument(get_automaton(self.value), self.names, literal=False)
+
+    @property
+    def regex(self):
+        """
+        Matcher which checks whether a string matches the argument as a regular expression.
+        """
+        return self._regex(0)
+
+    @property
+    def iregex(self):
+        """
+        Case-insensitive version of the regex matcher.
+        """
+        return self._regex(re.IGNORECASE)
+
+    def _regex(self, flags):
+        mode = self.options.get('mode', 'search')
+
+        if mode not in MODES:
+            raise FilterUsageError('"mode" should be set to one of "{0}"'.format('", "'.join(MODES)))
+
+        try:
+            regex = get_regex(self.value, mode, flags)
+        except re.error as error:
+            raise FilterUsageError('"{0}" is not a valid regular expression: {1}'.format(self.value, error))
+
+        return Argument(regex, self.names, literal=False)
+
+
+def augment(condition, augmentation):
+    """
+    Replaces all fields of the first argument in a condition, i.e. ``{0}`` or ``{0.upper}``,
+    with an augmentation, which refers to the argument as ``{0}``.
+
+    :param string condition: (required). Condition to augment.
+    :param string augmentation: (required). Augmentation to apply.
+    """
+    return re.sub(r'\{0((?:\.\w+)*)\}', lambda match: augmentation.replace('{0', '{0' + match.group(1)), condition)
 
 
 class Filter(object):
     """
     An abstract filter implementation.
 
-    All filters should inherit from this base class.
+    All filters should inherit from this base class. Filters are immutable, all operations
+    on a filter return a new filter, so that the same filter can be safely used by several
+    threads at once, e.g. filters that are attributes of datatypes.
     """
     datatype = None
     condition = None
+    cost = None
+    vector = None
+    locate = None
+    locator = None
 
-    def __init__(self, condition=None, names=None, accept_types=None):
+    def __init__(self, condition=None, names=None, accept_types=None, cost=None, vector=None, locate=None):
         """
         :param string condition: (optional). Condition to send to eval().
         :param dict names: (optional). Names to pass to eval().
         :param tuple accept_types: (optional). Types to accept.
+        :param integer cost: (optional). Relative cost of evaluating the condition, estimated if not set.
+        :param string vector: (optional). Condition to evaluate against whole NumPy arrays, see
+                              :mod:`instructions.vectors`.
+        :param string locate: (optional). Where the filter's argument is found inside matching objects, one of
+                              ``instructions.matchers.LOCATIONS``, used by commands searching for offsets.
         """
-        self.names = names or {}
-        self.accept_types = accept_types or ()
+        names = names or {}
+        accept_types = accept_types or ()
 
-        if not isinstance(self.names, dict):
+        if not isinstance(names, dict):
             raise FilterImplementationError('"names" is not a dict')
 
-        if not isinstance(self.accept_types, tuple):
+        if not isinstance(accept_types, tuple):
             raise FilterImplementationError('"accept_types" is not a tuple')
 
-        if condition is not None:
-            self.condition = condition
+        if condition is None:
+            condition = self.condition
 
-        if not isinstance(self.condition, string):
+        if not isinstance(condition, string):
             raise FilterImplementationError('"condition" is not a string')
 
-        self.raw_condition = self.condition
+        if cost is not None and not isinstance(cost, (int, float)):
+            raise FilterImplementationError('"cost" is not a number')
+
+        if vector is not None and not isinstance(vector, string):
+            raise FilterImplementationError('"vector" is not a string')
+
+        if locate is not None and locate not in LOCATIONS:
+            raise FilterImplementationError('"locate" should be set to one of "{0}"'.format('", "'.join(LOCATIONS)))
+
+        self.__dict__.update(names=names, accept_types=accept_types, condition=condition, raw_condition=condition)
+
+        if cost is not None:
+            self.__dict__['cost'] = cost
+
+        if vector is not None:
+            self.__dict__.update(vector=vector, raw_vector=vector)
+
+        if locate is not None:
+            self.__dict__['locate'] = locate
 
     def __call__(self, *args, **kwargs):
         """
@@ -49,7 +200,7 @@ class Filter(object):
         :param *args: (optional). Positional arguments that this filter takes if any.
         :param **kwargs: (optional). Keyword arguments that this filter takes if any.
         """
-        amount_expected, amount_got = len(set(re.findall('{\d+}', self.raw_condition))), len(args)
+        amount_expected, amount_got = len(set(re.findall(r'{(\d+)[.\w]*}', self.raw_condition))), len(args)
 
         if amount_expected != amount_got:
             raise FilterUsageError('expected {0} argument(s), got {1}'.format(amount_expected, amount_got))
@@ -60,27 +211,45 @@ class Filter(object):
                     raise FilterUsageError('"{0}" argument should be of "{1}" type(s)'.format(
                         arg, types.__name__ if not isinstance(types, tuple) else ', '.join(t.__name__ for t in types)))
 
-        self.condition = self.raw_condition.format(*[repr(arg) for arg in args], kwargs=kwargs)
-        return self
+        names = {}
+        arguments = [Argument(arg, names, kwargs) for arg in args]
+        attributes = {'condition': self.raw_condition.format(*arguments, kwargs=kwargs)}
+
+        if self.vector is not None:
+            attributes['vector'] = self.raw_vector.format(*arguments, kwargs=kwargs)
+
+        # Keyword arguments, i.e. start and end of startswith(), change where the argument
+        # is searched for, so offsets are located only for filters called without them
+        if self.locate is not None and not kwargs:
+            attributes['locator'] = Locator(args[0], self.locate)
+
+        return self._replace(names=dict(self.names, **names), **attributes)
 
     def __or__(self, other):
         """
         OR logical condition implementation.
         """
-        return self._combine(other, 'or')
+        vector = '({0}) | ({1})'.format(self.vector, other.vector) if self.vector and other.vector else None
+        return self._combine(Or.combine(self.tree, other.tree), vector)
 
     def __and__(self, other):
         """
         AND logical condition implementation.
         """
-        return self._combine(other, 'and')
+        vector = '({0}) & ({1})'.format(self.vector, other.vector) if self.vector and other.vector else None
+        return self._combine(And.combine(self.tree, other.tree), vector)
 
     def __invert__(self):
         """
         NOT logical condition implementation.
         """
-        self.condition = 'not {0}'.format(self.condition)
-        return self
+        return self._combine(Not(self.tree), '~({0})'.format(self.vector) if self.vector else None)
+
+    def __setattr__(self, name, value):
+        raise FilterImmutableError(name)
+
+    def __delattr__(self, name):
+        raise FilterImmutableError(name)
 
     def __str__(self):
         """
@@ -94,11 +263,41 @@ class Filter(object):
         """
         return '<{0}.{1} "{2}">'.format(self.__class__.__module__, self.__class__.__name__, self.condition)
 
-    def _combine(self, other, condition):
+    def _replace(self, **attributes):
         """
-        Helper function used in constructing some logical conditions.
+        Returns a copy of the filter with some of it's attributes replaced.
+
+        :param **attributes: (required). Attributes to replace.
+        """
+        filtr = copy.copy(self)
+        filtr.__dict__.update(attributes)
+        return filtr
+
+    @property
+    def tree(self):
+        """
+        Predicate tree of filter's condition, see :mod:`instructions.predicates`.
+        """
+        try:
+            return self.__dict__['_tree']
+        except KeyError:
+            return Leaf(self.condition, self.names, self.datatype, self.cost)
+
+    def _combine(self, tree, vector=None):
+        """
+        Helper function used in constructing logical conditions, returns a filter built from
+        a predicate tree. If all filters in the tree are of the same datatype, the filter is of
+        that datatype too, otherwise conditions of the filters are guarded by their datatypes.
+        Only filters of the same datatype keep the vector condition.
+
+        :param tree: (required). Predicate tree of the filter.
+        :type tree: :class:`instructions.predicates.Node`
+        :param string vector: (optional). Vector condition of the filter.
         """
-        return Filter('{0} {1} {2}'.format(self.condition, condition, other.condition))
+        filtr = Filter(tree.render(tree.datatype), tree.namespace(tree.datatype),
+                       vector=vector if tree.datatype is not None else None)
+        filtr.__dict__.update(datatype=tree.datatype, _tree=tree)
+        return filtr
 
 
 class AugmentedFilter(Filter):
@@ -0,0 +1,133 @@
+"""
+Defines an index which allows to query the same searchable many times without
+traversing it from scratch every time.
+"""
+
+from __future__ import unicode_literals
+
+import heapq
+import collections
+
+from .compat import stringlike, itervalues
+
+
+class Index(object):
+    """
+    Index walks a searchable once and buckets all found objects by their concrete
+    type, remembering the order and depth they were found at. Commands executed
+    inside an index only scan buckets of types that belong to their datatype.
+
+    Index should be used with searchables that don't change after the index was
+    built, otherwise the results will be based on the outdated contents.
+    """
+    def __init__(self, searchable):
+        """
+        :param iterable searchable: (required). An iterable data structure to be indexed.
+        """
+        self.searchable = searchable
+        self.buckets = {}
+
+        # A context describes the path to an object, i.e. types of all containers the
+        # object is nested in and whether the path goes through dict's keys or values.
+        # There are just a few distinct contexts in a typical data structure, so every
+        # object stores only a number of it's context instead of the whole path
+        self.contexts = [(frozenset(), frozenset())]
+        self._context_numbers = {self.contexts[0]: 0}
+        self._transitions = {}
+        self._build()
+
+    def __iter__(self):
+        return iter(self.searchable)
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def search(self, command):
+        """
+        Returns a generator which yields all objects in the index matching the command.
+
+        :param command: (required). Command to search for.
+        :type command: :class:`instructions.commands.Command`
+        """
+        # Objects shared by several containers are stored in the index once for every
+        # reference, so to skip them the searchable has to be traversed as usual, the
+        # same goes for offsets, as bytes-like buffers are not indexed as single objects
+        if command.dedupe or command.offsets:
+            return command.traversal(self.searchable)
+
+        return self._search(command)
+
+    def _search(self, command):
+        predicate = command.predicate
+        level = command.level
+        ignore = frozenset(command.ignore)
+        routes = frozenset(['values' if command.dicts and command.indict == 'values' else 'keys'])
+        gate = command.gate
+        admissible = {}
+
+        buckets = [bucket for type_, bucket in self.buckets.items() if gate is None or gate[type_]]
+
+        for _, depth, context, obj in (buckets[0] if len(buckets) == 1 else heapq.merge(*buckets)):
+            if level and depth > level:
+                continue
+
+            try:
+                allowed = admissible[context]
+            except KeyError:
+                containers, path = self.contexts[context]
+                allowed = admissible[context] = path <= routes and not containers & ignore
+
+            if allowed and type(obj) not in ignore and predicate(obj):
+                yield obj
+
+    def _build(self):
+        """
+        Walks the searchable in the same order as commands do and records every object found.
+        """
+        number = 0
+
+        # Dicts are searched through their keys or values depending on the command, so
+        # both of them are indexed and the dict itself is recorded after it's values
+        stack = [(iter(self.searchable), 1, 0, None, None)]
+
+        while stack:
+            items, depth, context, container, parent = stack[-1]
+
+            for obj in items:
+                if isinstance(obj, collections.Iterable) and not isinstance(obj, stringlike):
+                    if isinstance(obj, dict):
+                        values = self._context(context, type(obj), 'values')
+                        keys = self._context(context, type(obj), 'keys')
+                        stack.append((itervalues(obj), depth + 1, values, obj, context))
+                        stack.append((iter(obj), depth + 1, keys, None, None))
+                    else:
+                        stack.append((iter(obj), depth + 1, self._context(context, type(obj), None), obj, context))
+                    break
+
+                self.buckets.setdefault(type(obj), []).append((number, depth, context, obj))
+                number += 1
+            else:
+                stack.pop()
+
+                if parent is not None:
+                    self.buckets.setdefault(type(container), []).append((number, depth - 1, parent, container))
+                    number += 1
+
+    def _context(self, context, container, route):
+        """
+        Returns a number of context for objects found inside a container.
+        """
+        key = (context, container, route)
+
+        try:
+            return self._transitions[key]
+        except KeyError:
+            containers, path = self.contexts[context]
+            inner = (containers | frozenset([container]), path | frozenset([route]) if route else path)
+
+            if inner not in self._context_numbers:
+                self._context_numbers[inner] = len(self.contexts)
+                self.contexts.append(inner)
+
+            self._transitions[key] = self._context_numbers[inner]
+            return self._transitions[key]
@@ -0,0 +1,353 @@
+"""
+Defines matchers which are built from filter arguments once, when a filter is called,
+and then are used by filter's condition for every object, i.e. ``string.contains_any``,
+or by commands searching for offsets of filter's argument inside matching objects.
+"""
+
+from __future__ import unicode_literals
+
+import re
+import mmap
+
+from .compat import unicode, py2, py26
+from .compiler import Matches, cache
+
+Pattern = type(re.compile(''))
+ASCII = getattr(re, 'ASCII', 0)  #: the flag doesn't exist on Python 2
+MODES = ('search', 'match', 'fullmatch')
+LOCATIONS = ('exact', 'contains', 'startswith', 'endswith')
+VIEWS = () if py26 else (memoryview,)  #: memoryview doesn't exist on Python 2.6
+BUFFERS = VIEWS + (mmap.mmap,)  #: bytes-like objects which don't belong to any datatype, searched by locators
+
+
+class Automaton(object):
+    """
+    Aho-Corasick automaton which checks whether a string contains any of the patterns.
+    Each string is scanned only once, so checking it costs the same regardless of the
+    amount of patterns. Text and bytes are scanned by separate automatons, patterns are
+    converted to both forms using UTF-8.
+    """
+    def __init__(self, patterns):
+        """
+        :param patterns: (required). Patterns to search for.
+        :type patterns: list, tuple or set
+        """
+        self.patterns = tuple(patterns)
+
+        text, data = [], []
+
+        for pattern in self.patterns:
+            if isinstance(pattern, unicode):
+                text.append(pattern)
+                data.append(bytearray(pattern.encode('utf-8')))
+            else:
+                data.append(bytearray(pattern))
+
+                try:
+                    text.append(pattern.decode('utf-8'))
+                except UnicodeDecodeError:
+                    pass
+
+        self.text = self._build(text)
+        self.data = self._build(data)
+
+    def __call__(self, obj):
+        """
+        Returns whether a string contains any of the patterns.
+
+        :param obj: (required). String to check.
+        :type obj: str, bytes or bytearray
+        """
+        if isinstance(obj, (bytes, bytearray)):
+            transitions, terminal = self.data
+
+            # Data automaton's symbols are integers, but Python 2 bytes are iterated by characters
+            if py2 and isinstance(obj, bytes):
+                obj = bytearray(obj)
+        else:
+            transitions, terminal = self.text
+
+        if terminal[0]:
+            return True
+
+        state = 0
+
+        for symbol in obj:
+            state = transitions[state].get(symbol, 0)
+
+            if terminal[state]:
+                return True
+
+        return False
+
+    @staticmethod
+    def _build(patterns):
+        """
+        Builds transitions and terminal states of an automaton from the patterns. Failure links
+        are resolved in advance, so that every state knows where to go with any of the symbols.
+        """
+        transitions, terminal = [{}], [False]
+
+        for pattern in patterns:
+            state = 0
+
+            for symbol in pattern:
+                if symbol not in transitions[state]:
+                    transitions.append({})
+                    terminal.append(False)
+                    transitions[state][symbol] = len(transitions) - 1
+
+                state = transitions[state][symbol]
+
+            terminal[state] = True
+
+        # States are resolved breadth first, so a state's failure state is always resolved before
+        # the state itself. Symbols missing from a state lead to where it's failure state leads
+        failures = [0] * len(transitions)
+        queue = list(transitions[0].values())
+        symbols = set(symbol for state in transitions for symbol in state)
+
+        for state in queue:
+            failure = failures[state]
+            terminal[state] = terminal[state] or terminal[failure]
+
+            for symbol, target in list(transitions[state].items()):
+                failures[target] = transitions[failure].get(symbol, 0)
+                queue.append(target)
+
+            for symbol in symbols:
+                if symbol not in transitions[state] and transitions[failure].get(symbol, 0):
+                    transitions[state][symbol] = transitions[failure][symbol]
+
+        return transitions, terminal
+
+
+def get_automaton(patterns):
+    """
+    Returns an automaton for the patterns, automatons are cached, so the same
+    automaton is shared by all instructions searching for the same patterns.
+
+    :param patterns: (required). Patterns to search for.
+    :type patterns: list, tuple or set
+    """
+    patterns = tuple(patterns)
+    return cache.get(('automaton', patterns, tuple(type(pattern) for pattern in patterns)),
+                     lambda: Automaton(patterns))
+
+
+def compile_pattern(pattern, flags=0):
+    """
+    Compiles a regular expression, compiled expressions are cached, so the same
+    expression is shared by all instructions using the same pattern and flags.
+
+    :param pattern: (required). Regular expression to compile.
+    :type pattern: str or bytes
+    :param integer flags: (optional). Flags to compile the expression with.
+    """
+    return cache.get(('pattern', pattern, type(pattern), flags), lambda: re.compile(pattern, flags))
+
+
+class Regex(object):
+    """
+    Checks whether a string matches a regular expression. Text and bytes are checked by
+    separate expressions compiled from the pattern converted to both forms using UTF-8,
+    strings of the form which the pattern is invalid in never match.
+    """
+    def __init__(self, pattern, mode='search', flags=0):
+        """
+        :param pattern: (required). Regular expression to match.
+        :type pattern: str, bytes or compiled regular expression
+        :param string mode: (optional). Whether to search for a match anywhere in a string, match
+                            at the beginning of a string or match the whole string.
+        :param integer flags: (optional). Flags to compile the expression with.
+        """
+        if isinstance(pattern, Pattern):
+            pattern, flags = pattern.pattern, pattern.flags | flags
+
+        self.pattern = pattern
+        self.mode = mode
+        self.flags = flags
+
+        if isinstance(pattern, unicode):
+            text, data = pattern, pattern.encode('utf-8')
+        else:
+            text, data = None, bytes(pattern)
+
+            try:
+                text = data.decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+
+        # Unicode flag is implicitly set for text patterns on Python 3, unless the ASCII flag is,
+        # and it can't be used to compile bytes patterns
+        text_flags = flags if flags & ASCII else flags | re.UNICODE
+        data_flags = flags & ~re.UNICODE
+
+        # The form of the pattern other than the given one may be invalid, i.e. bytes can't
+        # contain named unicode escapes, then strings of that form never match
+        if isinstance(pattern, unicode):
+            self.text = self._method(text, text_flags)
+            self.data = self._variant(data, data_flags)
+        else:
+            self.text = self._variant(text, text_flags) if text is not None else None
+            self.data = self._method(data, data_flags)
+
+    def __call__(self, obj):
+        """
+        Returns whether a string matches the regular expression.
+
+        :param obj: (required). String to check.
+        :type obj: str, bytes or bytearray
+        """
+        method = self.data if isinstance(obj, (bytes, bytearray)) else self.text
+        return method is not None and method(obj) is not None
+
+    def __reduce__(self):
+        return self.__class__, (self.pattern, self.mode, self.flags)
+
+    def _method(self, pattern, flags):
+        """
+        Returns a method of a compiled expression used to check strings in the current mode.
+        """
+        if self.mode == 'fullmatch' and not hasattr(Pattern, 'fullmatch'):
+            wrapped = b'(?:' + pattern + b')\\Z' if isinstance(pattern, bytes) else '(?:' + pattern + ')\\Z'
+            return compile_pattern(wrapped, flags).match
+
+        return getattr(compile_pattern(pattern, flags), self.mode)
+
+    def _variant(self, pattern, flags):
+        """
+        Returns a method of a compiled expression converted from the pattern or None if the
+        converted expression is invalid.
+        """
+        try:
+            return self._method(pattern, flags)
+        except (re.error, ValueError):
+            return None
+
+
+def get_regex(pattern, mode='search', flags=0):
+    """
+    Returns a regex matcher for the pattern, matchers are cached, so the same matcher
+    is shared by all instructions using the same pattern, mode and flags.
+
+    :param pattern: (required). Regular expression to match.
+    :type pattern: str, bytes or compiled regular expression
+    :param string mode: (optional). One of ``search``, ``match`` or ``fullmatch``.
+    :param integer flags: (optional). Flags to compile the expression with.
+    """
+    return cache.get(('regex', pattern, type(pattern), mode, flags), lambda: Regex(pattern, mode, flags))
+
+
+class Locator(object):
+    """
+    Finds offsets of a pattern inside strings and bytes-like buffers, i.e. ``mmap.mmap`` or
+    ``memoryview``, in place, without slicing or copying them. Buffers which have ``find()``
+    are searched by a loop over it, memoryview is searched by a compiled expression. Text
+    and bytes are searched for the pattern converted to their form using UTF-8.
+    """
+    def __init__(self, pattern, location='contains'):
+        """
+        :param pattern: (required). Pattern to search for.
+        :type pattern: str, bytes or bytearray
+        :param string location: (optional). Where the pattern should be found, one of ``LOCATIONS``.
+        """
+        self.pattern = pattern
+        self.location = location
+
+        if isinstance(pattern, unicode):
+            self.text, self.data = pattern, pattern.encode('utf-8')
+        else:
+            self.text, self.data = None, bytes(pattern)
+
+            try:
+                self.text = self.data.decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+
+    def __call__(self, obj):
+        """
+        Returns a generator which yields offsets of the pattern inside an object, occurrences
+        of the pattern don't overlap, the same as they don't for ``bytes.count()``.
+
+        :param obj: (required). Object to search.
+        :type obj: str, bytes, bytearray, memoryview or mmap
+        """
+        # Python 2 can't cast memoryview or search it by an expression, so it's copied there instead
+        if isinstance(obj, VIEWS):
+            if py2:
+                return self._find(obj.tobytes(), self.data)
+
+            return self._match(obj if obj.format == 'B' else obj.cast('B'))
+
+        pattern = self.text if isinstance(obj, unicode) else self.data
+
+        if pattern is None:
+            return iter(())
+
+        return self._find(obj, pattern)
+
+    def count(self, obj):
+        """
+        Returns the amount of the pattern's occurrences inside an object.
+
+        :param obj: (required). Object to search.
+        :type obj: str, bytes, bytearray, memoryview or mmap
+        """
+        if self.location == 'contains' and isinstance(obj, (unicode, bytes, bytearray)):
+            pattern = self.text if isinstance(obj, unicode) else self.data
+            return obj.count(pattern) if pattern is not None else 0
+
+        return sum(1 for _ in self(obj))
+
+    def locate(self, matches, bulk=False):
+        """
+        Returns a generator which yields every object found by a command together with each offset of
+        the pattern inside it, objects without the pattern are skipped. If only the amount of offsets
+        is needed, it's yielded instead of the offsets themselves.
+
+        :param iterator matches: (required). Objects found by a command.
+        :param boolean bulk: (optional). Whether offsets should be yielded as their amount.
+        """
+        for obj in matches:
+            if bulk:
+                amount = self.count(obj)
+
+                if amount:
+                    yield Matches(amount)
+            else:
+                for offset in self(obj):
+                    yield obj, offset
+
+    def __reduce__(self):
+        return self.__class__, (self.pattern, self.location)
+
+    def _find(self, obj, pattern):
+        size, length = len(pattern), len(obj)
+
+        if self.location == 'contains':
+            offset = obj.find(pattern)
+
+            # Empty pattern is found at every offset, including the one past the end
+            while offset != -1:
+                yield offset
+                offset = obj.find(pattern, offset + (size or 1)) if offset < length else -1
+        elif self.location == 'startswith' or self.location == 'exact' and size == length:
+            if obj.find(pattern, 0, size) == 0:
+                yield 0
+        elif self.location == 'endswith' and size <= length:
+            if obj.find(pattern, length - size) == length - size:
+                yield length - size
+
+    def _match(self, obj):
+        expression, size, length = compile_pattern(re.escape(self.data)), len(self.data), len(obj)
+
+        if self.location == 'contains':
+            for match in expression.finditer(obj):
+                yield match.start()
+        elif self.location == 'startswith' or self.location == 'exact' and size == length:
+            if expression.match(obj):
+                yield 0
+        elif self.location == 'endswith' and size <= length:
+            if expression.match(obj, length - size):
+                yield length - size
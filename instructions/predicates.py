@@ -0,0 +1,631 @@
+"""
+Defines predicate trees built by combining filters with ``&``, ``|`` and ``~``.
+
+A tree keeps every filter's condition as a separate leaf, so combined conditions can be
+analyzed, deduplicated and rendered back into a single condition when a command is built.
+"""
+
+from __future__ import unicode_literals
+
+import ast
+import threading
+
+from .compat import OrderedDict
+from .compiler import cache, make_predicate, make_check, get_gate
+from .exceptions import FilterUsageError
+
+# Precedence of rendered conditions, conditions of a lower precedence are put
+# in parentheses when they are used as operands of a higher precedence operator
+LOWEST, OR, AND, NOT, ATOM = range(5)
+
+
+# Relative costs of evaluating parts of a condition used to estimate how expensive the
+# condition is, when a filter doesn't specify it's cost explicitly. Loops over the object
+# are the most expensive ones, while calls of cheap builtins cost as much as a comparison
+COSTS = {
+    'call': 4,
+    'builtin': 1,
+    'loop': 20,
+    'contains': 3,
+    'compare': 1,
+    'attribute': 1,
+    'operation': 1,
+    'unknown': 10,
+}
+CHEAP_BUILTINS = frozenset(['len', 'isinstance', 'type', 'int', 'bool'])
+
+# Subexpressions of datatypes' filters which raise for some objects of the datatype, i.e. int() of
+# infinity or NaN, or which guard such filters, filters using them may rely on the operands before
+# them or be relied on by the operands after them, so they are never moved
+UNSAFE = ('int(obj)', 'obj.is_integer()')
+
+
+def get_cost(condition):
+    """
+    Returns estimated cost of evaluating a condition against a single object.
+
+    :param string condition: (required). Condition to inspect.
+    """
+    def factory():
+        try:
+            tree = ast.parse(condition.strip(), mode='eval')
+        except SyntaxError:
+            return COSTS['unknown']
+
+        cost = 0
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                builtin = isinstance(node.func, ast.Name) and node.func.id in CHEAP_BUILTINS
+                cost += COSTS['builtin' if builtin else 'call']
+            elif isinstance(node, (ast.GeneratorExp, ast.ListComp, ast.SetComp, ast.DictComp)):
+                cost += COSTS['loop']
+            elif isinstance(node, ast.Compare):
+                contains = any(isinstance(op, (ast.In, ast.NotIn)) for op in node.ops)
+                cost += COSTS['contains' if contains else 'compare']
+            elif isinstance(node, ast.Attribute):
+                cost += COSTS['attribute']
+            elif isinstance(node, (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.IfExp)):
+                cost += COSTS['operation']
+
+        return cost
+
+    return cache.get(('cost', condition), factory)
+
+
+def same_value(value, other):
+    """
+    Returns whether two values of a name are interchangeable inside a condition. Equal values
+    of different types, i.e. 1 and True, are not, the same as for cached functions.
+
+    :param value: (required). Value to compare.
+    :param other: (required). Value to compare with.
+    """
+    if value is other:
+        return True
+
+    # Comparison of some values, i.e. NumPy arrays, can't be converted to a boolean
+    try:
+        return type(value) is type(other) and bool(value == other)
+    except (TypeError, ValueError):
+        return False
+
+
+class Statistics(object):
+    """
+    Keeps how many objects nodes were evaluated on and how many of them passed. Statistics
+    of the least recently updated nodes are discarded first, when there are too many nodes.
+    """
+    def __init__(self, maxsize=1024):
+        """
+        :param integer maxsize: (optional). Maximum amount of nodes to keep statistics for.
+        """
+        self.maxsize = maxsize
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, node, evaluated, passed):
+        """
+        Adds counts to node's statistics.
+
+        :param node: (required). Node the counts belong to.
+        :type node: :class:`Node`
+        :param integer evaluated: (required). How many objects the node was evaluated on.
+        :param integer passed: (required). How many of those objects passed.
+        """
+        with self._lock:
+            total_evaluated, total_passed = self._counts.pop(node, (0, 0))
+            self._counts[node] = (total_evaluated + evaluated, total_passed + passed)
+
+            while len(self._counts) > self.maxsize:
+                self._counts.popitem(last=False)
+
+    def get(self, node):
+        """
+        Returns a tuple of how many objects the node was evaluated on and how many of them passed.
+
+        :param node: (required). Node to return statistics for.
+        :type node: :class:`Node`
+        """
+        return self._counts.get(node, (0, 0))
+
+    def selectivity(self, node):
+        """
+        Returns estimated probability of an object passing the node, which is 0.5 for unseen nodes.
+
+        :param node: (required). Node to return selectivity for.
+        :type node: :class:`Node`
+        """
+        evaluated, passed = self.get(node)
+        return (passed + 1.0) / (evaluated + 2.0)
+
+    def clear(self):
+        """
+        Removes all statistics.
+        """
+        with self._lock:
+            self._counts.clear()
+
+
+statistics = Statistics()  #: observed selectivity of nodes shared by all adaptive commands
+
+
+def get_rank(node, operator, datatype=None, statistics=None):
+    """
+    Returns node's rank as an operand of a logical operator, operands of a lower rank should be
+    evaluated first. Without statistics the rank is just node's cost, with statistics, nodes that
+    are likely to short circuit the operator are ranked lower.
+
+    :param node: (required). Node to rank.
+    :type node: :class:`Node`
+    :param class operator: (required). Logical operator, i.e. :class:`And` or :class:`Or`.
+    :param class datatype: (optional). Datatype the node is rendered for.
+    :param statistics: (optional). Observed selectivity of nodes.
+    :type statistics: :class:`Statistics`
+    """
+    cost = node.estimate(datatype)
+
+    if statistics is None:
+        return cost
+
+    selectivity = statistics.selectivity(node)
+    return cost / (1 - selectivity) if operator is And else cost / selectivity
+
+
+def order(operator, children, datatype=None, statistics=None):
+    """
+    Returns operands of a logical operator sorted by their rank. Operands which contain filters
+    without a datatype and an explicit cost are never moved, because their conditions may rely
+    on the operands before them, i.e. ``Filter('hasattr(obj, "foo")') & Filter('obj.foo > 1')``,
+    the same goes for filters using subexpressions which may raise, see ``UNSAFE``.
+
+    :param class operator: (required). Logical operator, i.e. :class:`And` or :class:`Or`.
+    :param children: (required). Operands to sort.
+    :type children: list or tuple
+    :param class datatype: (optional). Datatype the operands are rendered for.
+    :param statistics: (optional). Observed selectivity of nodes.
+    :type statistics: :class:`Statistics`
+    """
+    def key(child):
+        return get_rank(child, operator, datatype, statistics)
+
+    ordered, movable = [], []
+
+    for child in children:
+        if child.movable:
+            movable.append(child)
+        else:
+            ordered += sorted(movable, key=key) + [child]
+            movable = []
+
+    return ordered + sorted(movable, key=key)
+
+
+def reorder(node, datatype=None, statistics=None):
+    """
+    Returns a tree which evaluates cheaper operands of logical operators first, so they can
+    short circuit the expensive ones.
+
+    :param node: (required). Tree to reorder.
+    :type node: :class:`Node`
+    :param class datatype: (optional). Datatype the tree is rendered for.
+    :param statistics: (optional). Observed selectivity of nodes.
+    :type statistics: :class:`Statistics`
+    """
+    if isinstance(node, Not):
+        return Not(reorder(node.child, datatype, statistics))
+
+    if not isinstance(node, Branch):
+        return node
+
+    children = [reorder(child, datatype, statistics) for child in node.children]
+    return node.__class__(order(node.__class__, children, datatype, statistics))
+
+
+def eliminate(node, datatype=None):
+    """
+    Returns a leaf which evaluates operands of a logical operator by a function where
+    subexpressions repeated in several operands, i.e. ``obj.upper()``, are evaluated only
+    once for every object. If there are no such subexpressions, the node itself is returned.
+
+    :param node: (required). Node to eliminate common subexpressions from.
+    :type node: :class:`Node`
+    :param class datatype: (optional). Datatype the node is rendered for.
+    """
+    if not isinstance(node, Branch):
+        return node
+
+    operands = [child.render(datatype) for child in node.children]
+    check = make_check(operands, isinstance(node, And), node.namespace(datatype))
+    return node if check is None else Leaf('_check(obj)', {'_check': check}, datatype)
+
+
+def get_precedence(condition):
+    """
+    Returns precedence of the outermost operator of a condition.
+
+    :param string condition: (required). Condition to inspect.
+    """
+    def factory():
+        try:
+            node = ast.parse(condition.strip(), mode='eval').body
+        except SyntaxError:
+            return LOWEST
+
+        if isinstance(node, ast.BoolOp):
+            return OR if isinstance(node.op, ast.Or) else AND
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return NOT
+        elif isinstance(node, (ast.IfExp, ast.Lambda)):
+            return LOWEST
+        else:
+            return ATOM
+
+    return cache.get(('precedence', condition), factory)
+
+
+class Node(object):
+    """
+    An abstract node of a predicate tree.
+
+    Every node is rendered relative to a datatype, conditions of leaves of that
+    datatype are rendered as is, while conditions of leaves of other datatypes are
+    guarded by their datatype's condition, so they never see objects of wrong types.
+    """
+    __slots__ = ()
+
+    @property
+    def datatype(self):
+        """
+        Datatype shared by all leaves of the node or None if leaves are of different datatypes.
+        """
+        datatypes = set(leaf.datatype for leaf in self.leaves())
+        return datatypes.pop() if len(datatypes) == 1 else None
+
+    def leaves(self):
+        """
+        Returns a generator which yields all leaves of the node.
+        """
+        raise NotImplementedError
+
+    def render(self, datatype=None):
+        """
+        Returns node's condition.
+
+        :param class datatype: (optional). Datatype to render the condition for.
+        """
+        raise NotImplementedError
+
+    def precedence(self, datatype=None):
+        """
+        Returns precedence of node's condition.
+
+        :param class datatype: (optional). Datatype to render the condition for.
+        """
+        raise NotImplementedError
+
+    def estimate(self, datatype=None):
+        """
+        Returns estimated cost of evaluating node's condition.
+
+        :param class datatype: (optional). Datatype to render the condition for.
+        """
+        return sum(leaf.estimate(datatype) for leaf in self.leaves())
+
+    @property
+    def movable(self):
+        """
+        Whether the node can be moved among operands of a logical operator.
+        """
+        return all(leaf.movable for leaf in self.leaves())
+
+    def namespace(self, datatype=None):
+        """
+        Returns names used inside node's condition. Conditions of all leaves share the namespace,
+        so leaves which use the same name for different values can't be combined.
+
+        :param class datatype: (optional). Datatype to render the condition for.
+        """
+        names = {}
+
+        for leaf in self.leaves():
+            for name, value in leaf.namespace(datatype).items():
+                if name in names and not same_value(names[name], value):
+                    raise FilterUsageError('combined filters use "{0}" name for different values'.format(name))
+
+                names[name] = value
+
+        return names
+
+    def operand(self, precedence, datatype=None):
+        """
+        Returns node's condition suitable to be an operand of an operator of the given precedence.
+
+        :param integer precedence: (required). Precedence of the operator.
+        :param class datatype: (optional). Datatype to render the condition for.
+        """
+        condition = self.render(datatype)
+        return '({0})'.format(condition) if self.precedence(datatype) < precedence else condition
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class Leaf(Node):
+    """
+    A single filter's condition.
+    """
+    __slots__ = ('condition', 'names', 'datatype', 'cost')
+
+    def __init__(self, condition, names=None, datatype=None, cost=None):
+        """
+        :param string condition: (required). Condition of the filter.
+        :param dict names: (optional). Names used inside the condition.
+        :param class datatype: (optional). Datatype of the filter.
+        :param integer cost: (optional). Cost of evaluating the condition, estimated if not set.
+        """
+        self.condition = condition
+        self.names = names or {}
+        self.datatype = datatype
+        self.cost = cost
+
+    def leaves(self):
+        yield self
+
+    def foreign(self, datatype):
+        """
+        Returns whether the condition has to be checked against objects of other datatypes.
+
+        :param class datatype: (required). Datatype to render the condition for.
+        """
+        return self.datatype is not None and self.datatype is not datatype
+
+    def guarded(self, datatype):
+        """
+        Returns whether the condition has to be guarded by it's datatype's condition.
+
+        :param class datatype: (required). Datatype to render the condition for.
+        """
+        return self.foreign(datatype) and self.condition != self.datatype.condition
+
+    def guard(self):
+        """
+        Returns condition of the leaf's datatype and names used inside it. NumPy scalars are not
+        instances of Python numbers, so datatypes of arrays' elements are checked by their type
+        gates instead, which let the scalars in, the same as commands of these datatypes do.
+        """
+        if self.datatype.kinds:
+            name = '_{0}_gate'.format(self.datatype.__name__)
+            return '{0}[type(obj)]'.format(name), {name: get_gate(self.datatype)}
+
+        return self.datatype.condition, self.datatype.names
+
+    def render(self, datatype=None):
+        if self.guarded(datatype):
+            return '{0} and {1}'.format(self.guard()[0], self.operand(AND, self.datatype))
+
+        return self.guard()[0] if self.foreign(datatype) else self.condition
+
+    def precedence(self, datatype=None):
+        if self.guarded(datatype):
+            return AND
+
+        return get_precedence(self.guard()[0] if self.foreign(datatype) else self.condition)
+
+    def estimate(self, datatype=None):
+        cost = get_cost(self.condition) if self.cost is None else self.cost
+        return cost + get_cost(self.datatype.condition) if self.guarded(datatype) else cost
+
+    @property
+    def movable(self):
+        if self.cost is not None:
+            return True
+
+        return self.datatype is not None and not any(unsafe in self.condition for unsafe in UNSAFE)
+
+    def namespace(self, datatype=None):
+        if self.foreign(datatype):
+            return dict(self.guard()[1], **self.names)
+
+        return dict(self.names)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Leaf) and
+            self.condition == other.condition and
+            self.datatype is other.datatype and
+            set(self.names) == set(other.names) and
+            all(same_value(value, other.names[name]) for name, value in self.names.items())
+        )
+
+    def __hash__(self):
+        return hash((self.condition, self.datatype, frozenset(self.names)))
+
+    def __reduce__(self):
+        return self.__class__, (self.condition, self.names, self.datatype, self.cost)
+
+    def __repr__(self):
+        return 'Leaf({0!r})'.format(self.condition)
+
+
+class Branch(Node):
+    """
+    An abstract logical operator over several nodes.
+    """
+    __slots__ = ('children',)
+    operator = None
+    level = None
+
+    def __init__(self, children):
+        """
+        :param tuple children: (required). Operands of the operator.
+        """
+        self.children = tuple(children)
+
+    @classmethod
+    def combine(cls, *nodes):
+        """
+        Returns a node which applies the operator to the given nodes. Nested operators of
+        the same kind are flattened and repeated operands are dropped, if just one operand
+        is left, the operand itself is returned.
+
+        :param *nodes: (required). Nodes to combine.
+        """
+        children = []
+
+        for node in nodes:
+            for child in (node.children if isinstance(node, cls) else (node,)):
+                if child not in children:
+                    children.append(child)
+
+        return children[0] if len(children) == 1 else cls(children)
+
+    def leaves(self):
+        for child in self.children:
+            for leaf in child.leaves():
+                yield leaf
+
+    def render(self, datatype=None):
+        return ' {0} '.format(self.operator).join(child.operand(self.level, datatype) for child in self.children)
+
+    def precedence(self, datatype=None):
+        return self.level
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.children == other.children
+
+    def __hash__(self):
+        return hash((type(self), self.children))
+
+    def __reduce__(self):
+        return self.__class__, (self.children,)
+
+    def __repr__(self):
+        return '{0}({1})'.format(self.__class__.__name__, ', '.join(repr(child) for child in self.children))
+
+
+class And(Branch):
+    """
+    Logical AND operator.
+    """
+    __slots__ = ()
+    operator = 'and'
+    level = AND
+
+
+class Or(Branch):
+    """
+    Logical OR operator.
+    """
+    __slots__ = ()
+    operator = 'or'
+    level = OR
+
+
+class Not(Node):
+    """
+    Logical NOT operator.
+    """
+    __slots__ = ('child',)
+
+    def __init__(self, child):
+        """
+        :param child: (required). Operand of the operator.
+        :type child: :class:`Node`
+        """
+        self.child = child
+
+    def leaves(self):
+        return self.child.leaves()
+
+    def render(self, datatype=None):
+        return 'not {0}'.format(self.child.operand(NOT, datatype))
+
+    def precedence(self, datatype=None):
+        return NOT
+
+    def __eq__(self, other):
+        return isinstance(other, Not) and self.child == other.child
+
+    def __hash__(self):
+        return hash((Not, self.child))
+
+    def __reduce__(self):
+        return self.__class__, (self.child,)
+
+    def __repr__(self):
+        return 'Not({0!r})'.format(self.child)
+
+
+class Probe(object):
+    """
+    Evaluates operands of a logical operator one by one, counting how many objects each of
+    them was evaluated on and how many of them passed. After every ``interval`` objects the
+    counts are added to the statistics and operands are reordered according to them, so that
+    an instruction executed many times converges to the fastest order of it's operands.
+
+    Counts are not synchronized between threads, so they are approximate if the probe is used
+    by several threads at once, which affects only the order of operands, but not the results.
+    Instructions get their probes from :func:`get_probe`, so that instructions with the same
+    operands share one probe and, as it's one of their names, their generated functions too.
+    """
+    interval = 1000  #: how many objects to evaluate before operands are reordered
+
+    def __init__(self, node, datatype=None, statistics=statistics):
+        """
+        :param node: (required). Logical operator to evaluate.
+        :type node: :class:`Branch`
+        :param class datatype: (optional). Datatype the operands are rendered for.
+        :param statistics: (optional). Statistics to add counts to.
+        :type statistics: :class:`Statistics`
+        """
+        names = node.namespace(datatype)
+
+        self.node = node
+        self.datatype = datatype
+        self.statistics = statistics
+        self.conjunction = isinstance(node, And)
+        self.predicates = dict((child, make_predicate(child.render(datatype), names)) for child in node.children)
+        self.operands = [[child, self.predicates[child], 0, 0] for child in node.children]
+
+    def __call__(self, obj):
+        operands = self.operands
+
+        if operands[0][2] >= self.interval:
+            operands = self.flush()
+
+        for operand in operands:
+            operand[2] += 1
+
+            if operand[1](obj):
+                operand[3] += 1
+
+                if not self.conjunction:
+                    return True
+            elif self.conjunction:
+                return False
+
+        return self.conjunction
+
+    def flush(self):
+        """
+        Adds counts to the statistics, reorders operands and returns them.
+        """
+        for child, _, evaluated, passed in self.operands:
+            self.statistics.update(child, evaluated, passed)
+
+        children = order(self.node.__class__, [operand[0] for operand in self.operands], self.datatype, self.statistics)
+        self.operands = [[child, self.predicates[child], 0, 0] for child in children]
+        return self.operands
+
+
+def get_probe(node, datatype=None):
+    """
+    Returns a probe for a logical operator, probes are cached, so the same probe is shared by
+    all adaptive instructions with the same operands.
+
+    :param node: (required). Logical operator to evaluate.
+    :type node: :class:`Branch`
+    :param class datatype: (optional). Datatype the operands are rendered for.
+    """
+    return cache.get(('probe', node, datatype), lambda: Probe(node, datatype))
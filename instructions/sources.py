@@ -0,0 +1,344 @@
+"""
+Defines searchables which read their items lazily from external sources, so that sources which
+don't fit into memory can be searched, i.e. ``instructions.sources.json_stream()`` for JSON
+documents and ``instructions.sources.json_lines()`` for newline delimited JSON.
+"""
+
+from __future__ import unicode_literals
+
+import json
+import codecs
+import itertools
+import collections
+
+from .compat import load, string
+from .exceptions import SourceDecodeError
+
+WHITESPACE = ' \t\n\r'
+NUMBER = '-+.0123456789eE'  #: characters numbers consist of
+
+
+class JSONReader(object):
+    """
+    Reads a JSON document from a file object chunk by chunk and decodes values from it one by one.
+    The buffer keeps only the part of the document which wasn't decoded yet, when a value doesn't
+    fit into the buffer, the buffer at least doubles, so that large values are decoded in
+    linear time.
+    """
+    def __init__(self, fileobj, chunksize=65536, decoder=None):
+        """
+        :param fileobj: (required). File object opened in text or binary mode, binary ones are decoded using UTF-8.
+        :param integer chunksize: (optional). How many characters or bytes to read at once.
+        :param decoder: (optional). Decoder to decode values with.
+        :type decoder: :class:`json.JSONDecoder`
+        """
+        self.fileobj = fileobj
+        self.chunksize = chunksize
+        self.decoder = decoder or json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0  #: position of the first character which wasn't decoded yet
+        self.offset = 0  #: position of the buffer's start inside the document
+        self.eof = False
+        self._text = codecs.getincrementaldecoder('utf-8')()
+
+    def read(self, size):
+        """
+        Appends at least a given amount of characters to the buffer, unless the document ends
+        earlier, the part of the buffer which was already decoded is discarded. Returns whether
+        anything was read.
+
+        :param integer size: (required). How many characters to read.
+        """
+        chunks = []
+
+        while not self.eof and sum(len(chunk) for chunk in chunks) < size:
+            data = self.fileobj.read(self.chunksize)
+            self.eof = not data
+            chunks.append(self._text.decode(data, final=self.eof) if isinstance(data, bytes) else data)
+
+        self.offset += self.position
+        self.buffer = self.buffer[self.position:] + ''.join(chunks)
+        self.position = 0
+        return any(chunks)
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character without consuming it, or an empty string
+        if the document ends.
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+
+            if self.position < len(self.buffer) or not self.read(self.chunksize):
+                return self.buffer[self.position:self.position + 1]
+
+    def expect(self, characters):
+        """
+        Consumes the next character, which should be one of the given characters, and returns it.
+
+        :param string characters: (required). Characters which are allowed.
+        """
+        character = self.peek()
+
+        if not character or character not in characters:
+            self.fail('expecting one of "{0}"'.format(characters))
+
+        self.position += 1
+        return character
+
+    def decode(self):
+        """
+        Decodes the next value and returns it.
+        """
+        self.peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                if self.read(max(self.chunksize, len(self.buffer) - self.position)):
+                    continue
+
+                self.fail('the value is invalid or incomplete')
+
+            # A number can continue in the next chunk if the buffer ends with it or with characters
+            # it consists of, i.e. a chunk boundary right after "1." leaves only "1" to decode
+            number = self.buffer[self.position] in NUMBER
+            rest = self.buffer[end:]
+
+            if (number or not rest) and all(character in NUMBER for character in rest) and self.read(self.chunksize):
+                continue
+
+            self.position = end
+            return value
+
+    def fail(self, reason):
+        """
+        Raises an error describing why the document can't be decoded at the current position.
+
+        :param string reason: (required). Why the document can't be decoded.
+        """
+        raise SourceDecodeError(reason, self.offset + self.position)
+
+
+def json_stream(fileobj, chunksize=65536, decoder=None):
+    """
+    Returns a generator which yields items of a JSON document's top level array or values of it's
+    top level object, decoding them one by one while the document is read, so that only a single
+    item has to be kept in memory at a time. Keys of the top level object are skipped, so unlike
+    for the document loaded as a whole, ``indict`` option of commands doesn't apply to them. A
+    document which top level value is not a container is yielded as a single item. The document
+    is read only as far as the search goes, i.e. the ``first`` command stops reading it as soon as
+    the first match is found.
+
+    :param fileobj: (required). File object opened in text or binary mode, binary ones are decoded using UTF-8.
+    :param integer chunksize: (optional). How many characters or bytes to read at once.
+    :param decoder: (optional). Decoder to decode items with, i.e. to set ``object_hook``.
+    :type decoder: :class:`json.JSONDecoder`
+    """
+    reader = JSONReader(fileobj, chunksize, decoder)
+    start = reader.peek()
+
+    if start not in ('[', '{'):
+        yield reader.decode()
+    else:
+        reader.expect(start)
+        end = ']' if start == '[' else '}'
+
+        if reader.peek() == end:
+            reader.expect(end)
+        else:
+            while True:
+                # Keys of the top level object are decoded only to be skipped, see above
+                if start == '{':
+                    if not isinstance(reader.decode(), string):
+                        reader.fail('expecting a key')
+
+                    reader.expect(':')
+
+                yield reader.decode()
+
+                if reader.expect(',' + end) == end:
+                    break
+
+    if reader.peek():
+        reader.fail('expecting the end of the document')
+
+
+def read_lines(source):
+    """
+    Returns a generator which yields lines of a file object or a memory mapped file.
+
+    :param source: (required). File object or ``mmap.mmap`` to read lines from.
+    """
+    while True:
+        line = source.readline()
+
+        if not line:
+            break
+
+        yield line
+
+
+def decode_lines(lines, decoder=None):
+    """
+    Decodes JSON lines and returns a list of their values together with their line numbers,
+    blank lines are skipped. This is executed in parallel by workers of :class:`JSONLines`.
+
+    :param lines: (required). Line numbers, positions inside the source and lines themselves.
+    :type lines: list of tuples
+    :param decoder: (optional). Decoder to decode lines with.
+    :type decoder: :class:`json.JSONDecoder`
+    """
+    decoder = decoder or json.JSONDecoder()
+    values = []
+
+    for lineno, position, raw in lines:
+        line = raw
+
+        # Positions count bytes of bytes sources, so offsets inside decoded lines are converted back
+        try:
+            if isinstance(raw, bytes):
+                line = raw.decode('utf-8')
+
+            if line.strip():
+                values.append((lineno, decoder.decode(line)))
+        except UnicodeDecodeError as error:
+            raise SourceDecodeError('line {0} is invalid: {1}'.format(lineno, error), position + error.start)
+        except ValueError as error:
+            offset = getattr(error, 'pos', 0)
+
+            if isinstance(raw, bytes):
+                offset = len(line[:offset].encode('utf-8'))
+
+            raise SourceDecodeError('line {0} is invalid: {1}'.format(lineno, error), position + offset)
+
+    return values
+
+
+def search_lines(command, lines, decoder=None):
+    """
+    Decodes JSON lines, searches them with a command and returns a list of line numbers together
+    with matches found in the lines. This is executed in parallel by workers of :class:`JSONLines`.
+
+    :param command: (required). Command to search with.
+    :type command: :class:`instructions.commands.Command`
+    :param lines: (required). Line numbers, positions inside the source and lines themselves.
+    :type lines: list of tuples
+    :param decoder: (optional). Decoder to decode lines with.
+    :type decoder: :class:`json.JSONDecoder`
+    """
+    found = []
+
+    for lineno, value in decode_lines(lines, decoder):
+        matches = command.traversal([value], command.stats)
+
+        if command.offsets:
+            matches = command.filter.locator.locate(matches)
+
+        found.extend((lineno, match) for match in matches)
+
+        if command.limit and len(found) >= command.limit:
+            break
+
+    return found
+
+
+class JSONLines(object):
+    """
+    Searchable newline delimited JSON, i.e. a log with a JSON document on every line, read
+    from a file object or a memory mapped file. Iterating over it yields decoded lines one
+    by one. Lines can also be searched in batches, optionally decoded and searched in parallel
+    by an executor, yielding matches together with numbers of lines they were found in. Only
+    a few batches are kept in memory at a time, no matter how large the source is.
+    """
+    def __init__(self, source, batchsize=1000, executor=None, decoder=None):
+        """
+        :param source: (required). File object, opened in text or binary mode, or ``mmap.mmap`` to read lines from.
+        :param integer batchsize: (optional). How many lines to decode and search in one task.
+        :param executor: (optional). Executor to decode and search batches of lines with in parallel.
+        :type executor: :class:`concurrent.futures.Executor`
+        :param decoder: (optional). Decoder to decode lines with, it has to be picklable for process executors.
+        :type decoder: :class:`json.JSONDecoder`
+        """
+        self.source = source
+        self.batchsize = batchsize
+        self.executor = executor
+        self.decoder = decoder
+
+    def __iter__(self):
+        for batch in self._batches():
+            for _, value in decode_lines(batch, self.decoder):
+                yield value
+
+    def search(self, command):
+        """
+        Returns a generator which yields line numbers, starting from 1, together with matches found
+        by a command inside the lines, i.e. ``(3, 'foo')``. Matches are found the same way as by the
+        ``find`` command with the same options, the amount of them is limited by command's limit.
+
+        :param command: (required). Command to search with.
+        :type command: :class:`instructions.commands.Command`
+        """
+        if self.executor is None:
+            results = (search_lines(command, batch, self.decoder) for batch in self._batches())
+        else:
+            results = self._parallel(command)
+
+        return itertools.islice(itertools.chain.from_iterable(results), command.limit or None)
+
+    def _parallel(self, command):
+        """
+        Submits batches of lines to the executor and yields their results in order. Only a limited
+        amount of batches is submitted ahead of the one whose results are being yielded, batches
+        that were not started yet are cancelled when the caller doesn't need more results.
+        """
+        pending = collections.deque()
+        ahead = load('multiprocessing').cpu_count() * 2
+
+        try:
+            for batch in self._batches():
+                pending.append(self.executor.submit(search_lines, command, batch, self.decoder))
+
+                if len(pending) > ahead:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _batches(self):
+        """
+        Yields batches of lines read from the source as lists of line numbers, positions of the
+        lines inside the source and the lines themselves.
+        """
+        batch, position = [], 0
+
+        for lineno, line in enumerate(read_lines(self.source), 1):
+            batch.append((lineno, position, line))
+            position += len(line)
+
+            if len(batch) == self.batchsize:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+
+def json_lines(source, batchsize=1000, executor=None, decoder=None):
+    """
+    Returns a searchable over newline delimited JSON read from a file object or a memory mapped file,
+    see :class:`JSONLines`.
+
+    :param source: (required). File object, opened in text or binary mode, or ``mmap.mmap`` to read lines from.
+    :param integer batchsize: (optional). How many lines to decode and search in one task.
+    :param executor: (optional). Executor to decode and search batches of lines with in parallel.
+    :type executor: :class:`concurrent.futures.Executor`
+    :param decoder: (optional). Decoder to decode lines with, it has to be picklable for process executors.
+    :type decoder: :class:`json.JSONDecoder`
+    """
+    return JSONLines(source, batchsize, executor, decoder)
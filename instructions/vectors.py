@@ -0,0 +1,209 @@
+"""
+Searches homogeneous arrays of numbers, i.e. NumPy arrays, ``array.array`` and ``memoryview``,
+as a whole, so that searching inside large arrays doesn't box every element into a Python
+object and check it's type one by one. Filters which support this define a vector condition
+besides the usual one, it takes an array as ``obj`` and returns a boolean mask of elements
+matching the filter. Typed buffers are searched by the vector condition if NumPy is installed
+and by a tight loop over the usual condition without any type checks otherwise. NumPy is never
+imported to recognize it's arrays, as there can't be any before it's imported by someone else, it's
+only imported when the first typed buffer is searched by a vector condition.
+"""
+
+from __future__ import unicode_literals
+
+import array
+
+from .compat import load, loaded, long, unicode, py3
+from .compiler import make_function
+
+MASK_TEMPLATE = '''
+def mask(obj):
+    return {0}
+'''
+
+SELECT_TEMPLATE = '''
+def select(items):
+    return [obj for obj in items if {0}]
+'''
+
+# NumPy dtype kinds of typed buffers by their typecodes, buffers of other
+# typecodes, i.e. characters or structures, are traversed as usual
+KINDS = dict([(typecode, 'i') for typecode in 'bhilq'] +
+             [(typecode, 'u') for typecode in 'BHILQ'] +
+             [(typecode, 'f') for typecode in 'efd'])
+
+TYPES = {'i': int, 'u': int, 'f': float}  #: Python types of elements of typed buffers by their kinds
+
+# Items of memoryview are characters on Python 2, they are searched as usual there
+BUFFERS = (array.array, memoryview) if py3 else (array.array,)
+
+# Types of all items typed buffers can hold, numbers and characters of typecodes like 'u' or 'c',
+# commands searching for objects of other types don't have to search inside typed buffers at all
+ITEMS = (int, long, float, bool, bytes, unicode)
+
+
+def integral(array):
+    """
+    Returns integral parts of array's elements, the same as int() does for a single number.
+
+    :param array: (required). Array to truncate.
+    :type array: :class:`numpy.ndarray`
+    """
+    return array if array.dtype.kind in 'iu' else load('numpy').trunc(array)
+
+
+def remainder(array, divisor):
+    """
+    Returns remainders of division of array's elements by the divisor. NumPy only warns about
+    division by zero, which is ignored while arrays are searched, so it's raised here instead,
+    the same as it is for a single number.
+
+    :param array: (required). Array to divide.
+    :type array: :class:`numpy.ndarray`
+    :param divisor: (required). Number to divide by.
+    :type divisor: int or float
+    """
+    if divisor == 0 and array.size:
+        raise ZeroDivisionError('integer division or modulo by zero')
+
+    return array % divisor
+
+
+def whole(array):
+    """
+    Returns a mask which selects all elements of an array, this is the vector condition of datatypes.
+
+    :param array: (required). Array to select elements of.
+    :type array: :class:`numpy.ndarray`
+    """
+    return load('numpy').ones(array.shape, dtype=bool)
+
+
+def get_kind(buffer):
+    """
+    Returns NumPy dtype kind of a typed buffer's elements or None if they are not numbers.
+
+    :param buffer: (required). Buffer to inspect.
+    :type buffer: array.array or memoryview
+    """
+    if isinstance(buffer, array.array):
+        return KINDS.get(buffer.typecode)
+
+    return KINDS.get(buffer.format.lstrip('@=<>!')) if buffer.ndim == 1 else None
+
+
+class ArrayTypes(dict):
+    """
+    Maps Python types to whether their objects are arrays searched by a vector, types which weren't
+    seen yet are checked on first lookup and remembered. NumPy arrays are searched only by vectors
+    which have a vector condition, NumPy is not imported here, the same as for the type gates.
+
+    There are only two instances of it, one for each kind of vectors, so they are compared by identity.
+    """
+    def __init__(self, ndarray):
+        """
+        :param boolean ndarray: (required). Whether NumPy arrays are searched.
+        """
+        super(ArrayTypes, self).__init__()
+        self.ndarray = ndarray
+
+    def __missing__(self, type_):
+        numpy = loaded('numpy')
+        self[type_] = type_ in BUFFERS or self.ndarray and numpy is not None and type_ is numpy.ndarray
+        return self[type_]
+
+    # dict's comparison and hashing are replaced, but object has no __eq__ to borrow on Python 2
+    __hash__ = object.__hash__
+
+    def __eq__(self, other):
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
+
+
+ARRAYS = ArrayTypes(True)  #: types of arrays searched by vectors which have a vector condition
+LOOPS = ArrayTypes(False)  #: types of arrays searched by vectors which loop over elements
+
+
+class Vector(object):
+    """
+    Finds elements of arrays matching a filter. Only arrays which dtype kinds
+    belong to filter's datatype are searched this way, i.e. ``'iu'`` for ints.
+
+    Vectors built from the same conditions compare equal, so that traversals using
+    them are shared by different commands just as any other generated functions.
+    """
+    def __init__(self, condition, names, kinds, ignore=(), vector=None):
+        """
+        :param string condition: (required). Condition to check elements of typed buffers against.
+        :param dict names: (required). Names used inside the conditions.
+        :param string kinds: (required). NumPy dtype kinds of arrays to search.
+        :param ignore: (optional). Types which should be ignored while searching.
+        :type ignore: list or tuple
+        :param string vector: (optional). Vector condition of the filter.
+        """
+        self.kinds = kinds
+        self.ignore = frozenset(ignore)
+        self.select = make_function(SELECT_TEMPLATE.format(condition), names, 'select')
+
+        if vector is not None:
+            names = dict(names, _integral=integral, _remainder=remainder, _whole=whole)
+            self.mask = make_function(MASK_TEMPLATE.format(vector), names, 'mask')
+            self.types = ARRAYS  #: types of arrays the vector searches
+        else:
+            self.mask = None
+            self.types = LOOPS
+
+    def __call__(self, array, depth=0):
+        """
+        Returns a sequence of elements matching the filter, in the same order as they are iterated
+        over, or None if the array can't be searched as a whole and should be traversed as usual.
+
+        :param array: (required). Array to search.
+        :type array: :class:`numpy.ndarray`, array.array or memoryview
+        :param integer depth: (optional). How many levels deep inside the array to search, unlimited if 0.
+        """
+        if isinstance(array, BUFFERS):
+            kind = get_kind(array)
+
+            if kind is None or kind not in self.kinds or TYPES[kind] in self.ignore:
+                return None
+
+            # Buffers are viewed as NumPy arrays without copying, but their
+            # elements are converted to the same Python numbers they iterate over
+            numpy = load('numpy') if self.mask is not None else None
+
+            if numpy is not None:
+                return self._apply(numpy.asarray(array)).tolist()
+
+            return self.select(array)
+
+        if array.dtype.kind not in self.kinds or array.dtype.type in self.ignore or (depth and array.ndim > depth):
+            return None
+
+        return self._apply(array)
+
+    def _apply(self, array):
+        """
+        Returns elements of a NumPy array selected by the vector condition.
+        """
+        # Comparisons and arithmetic with NaN emit warnings, which are expected here
+        with load('numpy').errstate(all='ignore'):
+            return array[self.mask(array)]
+
+    @property
+    def key(self):
+        """
+        Values vectors are compared and hashed by.
+        """
+        return self.select, self.mask, self.kinds, self.ignore
+
+    def __eq__(self, other):
+        return isinstance(other, Vector) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key)
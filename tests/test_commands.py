@@ -1,7 +1,15 @@
+import sys
+import array
 import types
+import pickle
+import collections
 
 from . import unittest
-from instructions import commands, datatypes, filters, exceptions
+import instructions
+from instructions import commands, datatypes, filters, exceptions, predicates
+from instructions.compat import load, unicode
+
+futures = load('concurrent.futures')
 
 
 class AssertsCollection(object):
@@ -86,11 +94,119 @@ class BaseCommandTestCase(unittest.TestCase):
         self.assertEqual(list(commands.find(datatypes.string.exact('fo'), indict='keys').inside(searchable)), ['fo'])
         self.assertEqual(list(commands.find(datatypes.string.exact('ba'), indict='values').inside(searchable)), ['ba'])
 
+    def test_command_dedupe_option(self):
+        shared = ['foo']
+        searchable = [shared, shared, [shared]]
+        searchable.append(searchable)
+        self.assertEqual(list(commands.find(datatypes.string, dedupe=True).inside(searchable)), ['foo'])
+        self.assertEqual(commands.count(datatypes.list, dedupe=True).inside(searchable), 2)
+        self.assertEqual(commands.count(datatypes.list, dedupe=True, level=1).inside(searchable), 2)
+
+    def test_command_dedupe_option_level(self):
+        shared = ['foo']
+        found = commands.find(datatypes.string, level=2, dedupe=True).inside([[shared], shared])
+        self.assertEqual(list(found), ['foo'])
+        nested = ['bar', shared]
+        searchable = [[nested], nested]
+        found = commands.find(datatypes.string, level=3, dedupe=True).inside(searchable)
+        self.assertEqual(list(found), ['bar', 'foo'])
+        self.assertEqual(commands.count(datatypes.list, level=3, dedupe=True).inside(searchable), 3)
+
+    def test_command_hashable_subclasses(self):
+        class HashableList(list):
+            __hash__ = object.__hash__
+
+        class HashableDict(dict):
+            __hash__ = object.__hash__
+
+        hashable_list, hashable_dict = HashableList([1]), HashableDict(a=1)
+        self.assertEqual(list(commands.find(datatypes.list).inside([set([hashable_list])])), [hashable_list])
+        self.assertEqual(list(commands.find(datatypes.dict).inside([frozenset([hashable_dict])])), [hashable_dict])
+        searchable = [{hashable_dict: 1}]
+        self.assertEqual(list(commands.find(datatypes.dict).inside(searchable)), [hashable_dict, searchable[0]])
+        self.assertEqual(list(commands.find(datatypes.list, indict='keys').inside([{hashable_list: 1}])),
+                         [hashable_list])
+
+    def test_command_pruning(self):
+        searchable = [array.array('l', [1, 2]), [array.array('d', [0.5]), [(3,)]], ('x',)]
+        command = commands.find(datatypes.tuple)
+        self.assertEqual(list(command.inside(searchable)), [(3,), ('x',)])
+        self.assertEqual(command.stats['pruned'], 2)
+
+        command = commands.find(datatypes.iterable, level=2)
+        self.assertEqual(len(list(command.inside(searchable))), 5)
+        self.assertEqual(command.stats['pruned'], 3)
+
+        command = commands.count(datatypes.int)
+        self.assertEqual(command.inside(searchable[:1]), 2)
+        self.assertEqual(command.stats['pruned'], 0)
+
     def test_command_option_errors(self):
         self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, limit='foo'))
         self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, level='foo'))
         self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, ignore='foo'))
         self.assertRaises(exceptions.CommandOptionError, lambda: commands.find(datatypes.bool, indict='foo'))
+        self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, dedupe='foo'))
+        self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, optimize='foo'))
+        self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, adaptive='foo'))
+        self.assertRaises(exceptions.CommandOptionError, lambda: commands.find(datatypes.bool, adaptive=True,
+                                                                               optimize=False))
+        self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, offsets='foo'))
+        self.assertRaises(exceptions.CommandOptionError, lambda: commands.find(datatypes.bytes, offsets=True))
+        self.assertRaises(exceptions.CommandOptionError,
+                          lambda: commands.find(datatypes.bytes.startswith(b'a', start=1), offsets=True))
+
+    def test_command_optimize_unsafe(self):
+        filtr = datatypes.float.isinteger() & datatypes.float.isodd() & datatypes.float.gt(1)
+        searchable = [float('inf'), float('nan'), 3.0, 0.5] * 500
+        self.assertEqual(len(list(commands.find(filtr).inside(searchable))), 500)
+        self.assertEqual(len(list(commands.find(filtr, adaptive=True).inside(searchable))), 500)
+        self.assertIn('obj.is_integer() and int(obj) % 2 != 0', commands.find(filtr).raw_condition)
+
+    def test_command_optimize_option(self):
+        filtr = datatypes.string.contains('o') & datatypes.string.len(3)
+        contains = '({0!r} if isinstance(obj, (bytes, bytearray)) else {1!r}) in obj'.format(b'o', unicode('o'))
+        self.assertTrue(commands.find(filtr).raw_condition.endswith('and len(obj) == 3 and ' + contains))
+        self.assertEqual(commands.find(filtr, optimize=False).raw_condition.split(' and ')[-1], 'len(obj) == 3')
+        self.assertEqual(list(commands.find(filtr).inside(['foo', 'bar', 'fo', 1])), ['foo'])
+
+    def test_command_adaptive_option(self):
+        predicates.statistics.clear()
+        filtr = datatypes.string.contains('z') & datatypes.string.len(3)
+        command = commands.find(filtr, adaptive=True)
+        self.assertEqual(command.probe.operands[0][0], datatypes.string.len(3).tree)
+        self.assertEqual(list(command.inside(['foo'] * command.probe.interval + ['baz', 1, 'zz'])), ['baz'])
+        self.assertEqual(command.probe.operands[0][0], datatypes.string.contains('z').tree)
+        self.assertEqual(commands.find(filtr, adaptive=True).probe.operands[0][0], datatypes.string.contains('z').tree)
+        self.assertIsNone(commands.find(datatypes.string.len(3), adaptive=True).probe)
+
+    def test_command_adaptive_option_shared(self):
+        filtr = datatypes.string.contains('y') & datatypes.string.len(2)
+        first, second = commands.find(filtr, adaptive=True), commands.find(filtr, adaptive=True)
+        self.assertIs(first.probe, second.probe)
+        self.assertIs(first.traversal, second.traversal)
+
+    def test_command_offsets_option(self):
+        searchable = [b'abab', bytearray(b'cab'), [memoryview(b'ab-ab')], unicode('ab')]
+        view = searchable[2][0]
+        self.assertEqual(list(commands.find(datatypes.bytes.contains(b'ab'), offsets=True).inside(searchable)),
+                         [(b'abab', 0), (b'abab', 2), (view, 0), (view, 3)])
+        self.assertEqual(list(commands.find(datatypes.string.endswith('ab'), offsets=True).inside(searchable)),
+                         [(b'abab', 2), (bytearray(b'cab'), 1), (view, 3), ('ab', 0)])
+        self.assertEqual(commands.first(datatypes.bytearray.contains(b'b'), offsets=True).inside(searchable),
+                         (bytearray(b'cab'), 2))
+        self.assertEqual(commands.last(datatypes.string.startswith('ab'), offsets=True).inside(searchable), ('ab', 0))
+        self.assertTrue(commands.exists(datatypes.bytes.exact(b'ab-ab'), offsets=True).inside(searchable))
+        self.assertEqual(commands.count(datatypes.string.contains('ab'), offsets=True).inside(searchable), 6)
+        self.assertEqual(commands.count(datatypes.string.contains('ab'), offsets=True, limit=4).inside(searchable), 4)
+        index = instructions.Index(searchable)
+        self.assertEqual(commands.count(datatypes.bytes.contains(b'ab'), offsets=True).inside(index), 4)
+
+    def test_command_predicate(self):
+        command = commands.find(datatypes.string.len(3))
+        self.assertTrue(command.predicate('foo'))
+        self.assertFalse(command.predicate('fo'))
+        self.assertFalse(command.predicate(123))
 
     def test_command_not_implemented(self):
         with self.assertRaises(NotImplementedError):
@@ -99,11 +215,161 @@ class BaseCommandTestCase(unittest.TestCase):
             BadCommand(datatypes.bool).inside([])
 
 
+class CompoundsTestCase(unittest.TestCase):
+    def test_memoized(self):
+        self.assertIs(commands.findstring__len, commands.findstring__len)
+        self.assertIs(instructions.findstring__len, commands.findstring__len)
+
+    def test_dir(self):
+        self.assertIn('countbool__true', dir(commands))
+        self.assertIn('countbool__true', dir(instructions))
+        self.assertIn('findstring', dir(instructions))
+
+        for module in (instructions, commands, commands.compounds):
+            self.assertEqual([name for name in dir(module) if not hasattr(module, name)], [])
+
+    def test_star_import(self):
+        for module in ('instructions', 'instructions.commands', 'instructions.commands.compounds'):
+            namespace = {}
+            exec('from {0} import *'.format(module), namespace)
+            self.assertIs(namespace['findstring__len'], commands.findstring__len)
+            self.assertNotIn('compounds', namespace)
+
+        namespace = {}
+        exec('from instructions import *', namespace)
+        self.assertIs(namespace['find'], commands.find)
+        self.assertIs(namespace['Index'], instructions.Index)
+
+    def test_unknown_instruction(self):
+        self.assertRaises(AttributeError, lambda: commands.findfoo)
+        self.assertRaises(AttributeError, lambda: commands.findstring__foo)
+        self.assertRaises(AttributeError, lambda: instructions.findstring__foo)
+        self.assertRaises(AttributeError, lambda: instructions.get_instruction)
+
+    def test_filter_arguments(self):
+        self.assertEqual(list(commands.findstring__regex('fo', mode='fullmatch').inside(['foo'])), [])
+        self.assertEqual(commands.findstring__regex('fo', mode='match', limit=1).inside(['foo']), 'foo')
+
+
+@unittest.skipIf(futures is None, 'concurrent.futures is not available')
+class ParallelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.searchable = [[i, str(i), {'foo': i * 2}] for i in range(100)]
+
+    def test_workers(self):
+        for options in ({'workers': 4}, {'workers': 3, 'chunksize': 7}, {'workers': 2, 'level': 2}):
+            expected = list(commands.find(datatypes.int, level=options.get('level', 0)).inside(self.searchable))
+            self.assertEqual(list(commands.find(datatypes.int, **options).inside(self.searchable)), expected)
+
+    def test_executor(self):
+        with futures.ThreadPoolExecutor(2) as executor:
+            self.assertEqual(commands.count(datatypes.int, executor=executor).inside(self.searchable), 200)
+            command = commands.first(datatypes.string, executor=executor, chunksize=3)
+            self.assertEqual(command.inside(self.searchable), '0')
+            self.assertEqual(commands.last(datatypes.string, executor=executor).inside(self.searchable), '99')
+            self.assertTrue(commands.exists(datatypes.dict, executor=executor).inside(iter(self.searchable)))
+            self.assertFalse(commands.exists(datatypes.float, executor=executor).inside(self.searchable))
+
+    def test_processes(self):
+        self.assertEqual(commands.count(datatypes.int, processes=2).inside(self.searchable), 200)
+        self.assertEqual(commands.count(datatypes.int, processes=2, limit=5).inside(self.searchable), 5)
+        self.assertEqual(commands.first(datatypes.string.contains('9'), processes=2).inside(self.searchable), '9')
+        self.assertEqual(commands.last(datatypes.string, processes=2).inside(self.searchable), '99')
+        self.assertTrue(commands.exists(datatypes.string.exact('42'), processes=2).inside(self.searchable))
+        self.assertEqual(list(commands.find(datatypes.dict.contains_value(20), processes=2).inside(self.searchable)),
+                         [{'foo': 20}])
+
+    def test_pickle(self):
+        command = pickle.loads(pickle.dumps(commands.count(datatypes.string.contains('1'), level=2, workers=2)))
+        self.assertIsInstance(command, commands.count)
+        self.assertEqual(command.options, {'level': 2})
+        self.assertEqual(command.inside(self.searchable), 19)
+
+    def test_limit(self):
+        result = commands.find(datatypes.string, workers=2, chunksize=10, limit=15).inside(self.searchable)
+        self.assertEqual(list(result), [str(i) for i in range(15)])
+
+    def test_option_errors(self):
+        self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, workers='foo'))
+        self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, chunksize='foo'))
+        self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, executor='foo'))
+        self.assertRaises(exceptions.CommandOptionError, lambda: commands.find(datatypes.bool, workers=2, dedupe=True))
+        self.assertRaises(exceptions.CommandOptionTypeError, lambda: commands.find(datatypes.bool, processes='foo'))
+        self.assertRaises(exceptions.CommandOptionError, lambda: commands.find(datatypes.bool, processes=2, workers=2))
+
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.searchable = [1, 'foo', [2, 'bar', {'baz': 3, 'qux': ['quux']}], (4,)]
+
+    def test_results(self):
+        batch = commands.batch([
+            commands.find(datatypes.int),
+            commands.first(datatypes.string.startswith('b')),
+            commands.last(datatypes.int),
+            commands.exists(datatypes.dict),
+            commands.count(datatypes.string),
+            commands.find(datatypes.dict),
+            commands.find(datatypes.string, indict='keys'),
+            commands.find(datatypes.int, ignore=[tuple]),
+            commands.count(datatypes.int, level=1),
+            commands.find(datatypes.int, limit=2),
+            commands.find(datatypes.string.contains('a'), offsets=True),
+            commands.count(datatypes.string.contains('u'), offsets=True)
+        ])
+        results = batch.inside(self.searchable)
+
+        for command, result in zip(batch.commands, results):
+            expected = command.inside(self.searchable)
+
+            if isinstance(expected, collections.Iterator):
+                self.assertEqual(list(result), list(expected))
+            else:
+                self.assertEqual(result, expected)
+
+    def test_dedupe(self):
+        shared = ['foo']
+        searchable = [shared, shared]
+        searchable.append(searchable)
+        self.assertEqual(commands.batch([
+            commands.count(datatypes.string, dedupe=True),
+            commands.count(datatypes.list, dedupe=True, level=1)
+        ]).inside(searchable), [1, 1])
+
+        shared = ['foo']
+        found, counted = commands.batch([
+            commands.find(datatypes.string, level=2, dedupe=True),
+            commands.count(datatypes.list, level=2, dedupe=True)
+        ]).inside([[shared], shared])
+        self.assertEqual((list(found), counted), (['foo'], 2))
+
+    def test_stops_when_done(self):
+        searchable = iter([1, 'foo', 2, 3])
+        self.assertEqual(commands.batch([
+            commands.exists(datatypes.int),
+            commands.first(datatypes.string)
+        ]).inside(searchable), [True, 'foo'])
+        self.assertEqual(list(searchable), [2, 3])
+
+    def test_command_type_error(self):
+        self.assertRaises(exceptions.CommandTypeError, lambda: commands.batch([datatypes.string]))
+
+
 class FindCommandTestCase(unittest.TestCase):
     def test_prototype(self):
         self.assertIsInstance(commands.find(datatypes.bool), commands.Command)
         self.assertIsInstance(commands.find(datatypes.bool).inside([]), types.GeneratorType)
 
+    def test_deeply_nested(self):
+        searchable = ['foo']
+        for _ in range(sys.getrecursionlimit() * 2):
+            searchable = [searchable]
+        self.assertEqual(list(commands.find(datatypes.string).inside(searchable)), ['foo'])
+
+    def test_containers_after_items(self):
+        searchable = [{'foo': [1]}, (2,)]
+        self.assertEqual(list(commands.find(datatypes.iterable).inside(searchable)), [[1], {'foo': [1]}, (2,)])
+
 
 class FindCommandBoolDatatypeTestCase(AssertsCollection, unittest.TestCase):
     def test_prototype_exact(self):
@@ -182,6 +448,59 @@ class FindCommandStringDatatypeTestCase(AssertsCollection, unittest.TestCase):
             'ignore': [self.foo, 'fOo']
         })
 
+    def test_prototype_contains_any(self):
+        self.find_prototype_asserts(datatypes.string.contains_any(['x', 'oo']), (self.foo, self.foo, (self.foo,)),
+                                    self.foo)
+
+    def test_compound_contains_any(self):
+        self.find_compound_asserts('string__contains_any', [['x', 'oo']], (self.foo, self.foo, (self.foo,)), self.foo)
+
+    def test_prototype_icontains_any(self):
+        self.find_prototype_asserts(datatypes.string.icontains_any(['X', 'OO']), (self.foo, 'fOo', ('Foo',)), {
+            'nolimit': [self.foo, 'fOo', 'Foo'],
+            'limit1': self.foo,
+            'limit2': [self.foo, 'fOo'],
+            'level1': [self.foo, 'fOo'],
+            'level2': [self.foo, 'fOo', 'Foo'],
+            'ignore': [self.foo, 'fOo']
+        })
+
+    def test_compound_icontains_any(self):
+        self.find_compound_asserts('string__icontains_any', [['X', 'OO']], (self.foo, 'fOo', ('Foo',)), {
+            'nolimit': [self.foo, 'fOo', 'Foo'],
+            'limit1': self.foo,
+            'limit2': [self.foo, 'fOo'],
+            'level1': [self.foo, 'fOo'],
+            'level2': [self.foo, 'fOo', 'Foo'],
+            'ignore': [self.foo, 'fOo']
+        })
+
+    def test_prototype_regex(self):
+        self.find_prototype_asserts(datatypes.string.regex('^fo+$'), (self.foo, self.foo, (self.foo,)), self.foo)
+
+    def test_compound_regex(self):
+        self.find_compound_asserts('string__regex', ['o+'], (self.foo, self.foo, (self.foo,)), self.foo)
+
+    def test_prototype_iregex(self):
+        self.find_prototype_asserts(datatypes.string.iregex('FO+', mode='fullmatch'), (self.foo, 'fOo', ('Foo',)), {
+            'nolimit': [self.foo, 'fOo', 'Foo'],
+            'limit1': self.foo,
+            'limit2': [self.foo, 'fOo'],
+            'level1': [self.foo, 'fOo'],
+            'level2': [self.foo, 'fOo', 'Foo'],
+            'ignore': [self.foo, 'fOo']
+        })
+
+    def test_compound_iregex(self):
+        self.find_compound_asserts('string__iregex', ['^F'], (self.foo, 'fOo', ('Foo',)), {
+            'nolimit': [self.foo, 'fOo', 'Foo'],
+            'limit1': self.foo,
+            'limit2': [self.foo, 'fOo'],
+            'level1': [self.foo, 'fOo'],
+            'level2': [self.foo, 'fOo', 'Foo'],
+            'ignore': [self.foo, 'fOo']
+        })
+
     def test_prototype_startswith(self):
         self.find_prototype_asserts(datatypes.string.startswith('f'), (self.foo, self.foo, (self.foo,)), self.foo)
 
@@ -6591,6 +6910,30 @@ class CountCommandStringDatatypeTestCase(AssertsCollection, unittest.TestCase):
     def test_compound_icontains(self):
         self.count_compound_asserts('string__icontains', ['O'], (self.foo, 'fOo'), 2)
 
+    def test_prototype_contains_any(self):
+        self.count_prototype_asserts(datatypes.string.contains_any(['x', 'oo']), (self.foo, b'boo', 'bar'), 2)
+
+    def test_compound_contains_any(self):
+        self.count_compound_asserts('string__contains_any', [['x', 'oo']], (self.foo, b'boo', 'bar'), 2)
+
+    def test_prototype_icontains_any(self):
+        self.count_prototype_asserts(datatypes.string.icontains_any(['X', 'OO']), (self.foo, b'bOo', 'bar'), 2)
+
+    def test_compound_icontains_any(self):
+        self.count_compound_asserts('string__icontains_any', [['X', 'OO']], (self.foo, b'bOo', 'bar'), 2)
+
+    def test_prototype_regex(self):
+        self.count_prototype_asserts(datatypes.string.regex('o+$'), (self.foo, b'boo', 'bar'), 2)
+
+    def test_compound_regex(self):
+        self.count_compound_asserts('string__regex', ['o+$'], (self.foo, b'boo', 'bar'), 2)
+
+    def test_prototype_iregex(self):
+        self.count_prototype_asserts(datatypes.string.iregex('O+$'), (self.foo, b'bOo', 'bar'), 2)
+
+    def test_compound_iregex(self):
+        self.count_compound_asserts('string__iregex', ['O+$'], (self.foo, b'bOo', 'bar'), 2)
+
     def test_prototype_startswith(self):
         self.count_prototype_asserts(datatypes.string.startswith('f'), (self.foo, self.foo), 2)
 
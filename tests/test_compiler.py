@@ -0,0 +1,176 @@
+from . import unittest
+from instructions import compiler, commands, datatypes
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = compiler.LRUCache(maxsize=2)
+
+    def test_hits_and_misses(self):
+        self.assertEqual(self.cache.get('foo', lambda: 1), 1)
+        self.assertEqual(self.cache.get('foo', lambda: 2), 1)
+        self.assertEqual(self.cache.info(), compiler.CacheInfo(hits=1, misses=1, maxsize=2, currsize=1))
+
+    def test_eviction(self):
+        self.cache.get('foo', lambda: 1)
+        self.cache.get('bar', lambda: 2)
+        self.cache.get('foo', lambda: 3)
+        self.cache.get('baz', lambda: 4)
+        self.assertEqual(self.cache.get('foo', lambda: 5), 1)
+        self.assertEqual(self.cache.get('bar', lambda: 6), 6)
+
+    def test_clear(self):
+        self.cache.get('foo', lambda: 1)
+        self.cache.clear()
+        self.assertEqual(self.cache.info(), compiler.CacheInfo(hits=0, misses=0, maxsize=2, currsize=0))
+
+
+class MakeFunctionTestCase(unittest.TestCase):
+    def test_shared_between_commands(self):
+        command1 = commands.find(datatypes.string.contains('foo'))
+        command2 = commands.find(datatypes.string.contains('foo'))
+        self.assertIs(command1.predicate, command2.predicate)
+        self.assertIs(command1.traversal, command2.traversal)
+
+    def test_names_types(self):
+        self.assertIsNot(compiler.make_predicate('obj is x', {'x': 1}),
+                         compiler.make_predicate('obj is x', {'x': True}))
+
+    def test_unhashable_names(self):
+        predicate = compiler.make_predicate('obj in x', {'x': [1]})
+        self.assertTrue(predicate(1))
+
+
+class TypeGateTestCase(unittest.TestCase):
+    def test_gate(self):
+        gate = compiler.TypeGate(datatypes.numeric)
+        self.assertTrue(gate[int])
+        self.assertFalse(gate[bool])
+        self.assertFalse(gate[str])
+        self.assertEqual(dict(gate), {int: True, bool: False, str: False})
+
+    def test_subclasses(self):
+        gate = compiler.TypeGate(datatypes.string)
+        self.assertTrue(gate[type(str('foo'))])
+        self.assertTrue(gate[type('Foo', (bytearray,), {})])
+
+    def test_shared(self):
+        self.assertIs(compiler.get_gate(datatypes.int), compiler.get_gate(datatypes.int))
+        self.assertIsNot(compiler.get_gate(datatypes.int), compiler.get_gate(datatypes.float))
+        self.assertNotEqual(compiler.TypeGate(datatypes.int), compiler.TypeGate(datatypes.int))
+
+
+class MakePredicateTestCase(unittest.TestCase):
+    def test_predicate(self):
+        predicate = compiler.make_predicate('isinstance(obj, foo) and obj > 1', {'foo': int})
+        self.assertTrue(predicate(2))
+        self.assertFalse(predicate(1))
+        self.assertFalse(predicate('foo'))
+
+
+class MakeTraversalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.condition = 'isinstance(obj, int)'
+        self.searchable = [1, [2, (3,)], {'a': 4, 5: 'b'}]
+
+    def test_traversal(self):
+        traverse = compiler.make_traversal(self.condition, {})
+        self.assertEqual(list(traverse(self.searchable)), [1, 2, 3, 4])
+
+    def test_level(self):
+        traverse = compiler.make_traversal(self.condition, {}, level=2)
+        self.assertEqual(list(traverse(self.searchable)), [1, 2, 4])
+
+    def test_ignore(self):
+        traverse = compiler.make_traversal(self.condition, {}, ignore=(tuple, dict))
+        self.assertEqual(list(traverse(self.searchable)), [1, 2])
+
+    def test_indict(self):
+        traverse = compiler.make_traversal(self.condition, {}, indict='keys')
+        self.assertEqual(list(traverse(self.searchable)), [1, 2, 3, 5])
+
+    def test_no_dicts(self):
+        traverse = compiler.make_traversal('isinstance(obj, dict)', {}, dicts=False)
+        self.assertEqual(list(traverse([{'a': {}}, {}])), [{'a': {}}, {}])
+
+    def test_dedupe(self):
+        shared = {'a': [1]}
+        traverse = compiler.make_traversal(self.condition, {}, dedupe=True)
+        self.assertEqual(list(traverse([shared, [shared], shared])), [1])
+
+    def test_dedupe_level(self):
+        shared = [1]
+        traverse = compiler.make_traversal('isinstance(obj, list)', {}, level=1, dedupe=True)
+        self.assertEqual(list(traverse([shared, shared])), [shared])
+
+    def test_gate(self):
+        traverse = compiler.make_traversal('obj > 2', {}, gate=compiler.TypeGate(datatypes.int))
+        self.assertEqual(list(traverse(['foo', 3, [1, 4.0, (5,)]])), [3, 5])
+
+    def test_prune(self):
+        stats = {'pruned': 0}
+        traverse = compiler.make_traversal('isinstance(obj, list)', {}, prune=(set,))
+        self.assertEqual(list(traverse([[1], set([2]), [set([3])]], stats)), [[1], [set([3])]])
+        self.assertEqual(stats['pruned'], 2)
+        self.assertEqual(list(traverse([set([2])])), [])
+
+    def test_prune_level(self):
+        stats = {'pruned': 0}
+        traverse = compiler.make_traversal('isinstance(obj, list)', {}, level=2)
+        self.assertEqual(list(traverse([[1, [2, [3]]], [4], 5], stats)), [[2, [3]], [1, [2, [3]]], [4]])
+        self.assertEqual(stats['pruned'], 1)
+
+        traverse = compiler.make_traversal('isinstance(obj, list)', {}, level=2, dedupe=True)
+        self.assertEqual(list(traverse([[1, [2, [3]]], [4], 5], stats)), [[2, [3]], [1, [2, [3]]], [4]])
+        self.assertEqual(stats['pruned'], 2)
+
+
+class SubexpressionsTestCase(unittest.TestCase):
+    def test_find(self):
+        found = compiler.find_subexpressions('obj.upper() == "A" and len(obj) == 1')
+        self.assertEqual(found, [('obj.upper()', 0, 11), ('len(obj)', 23, 31)])
+
+    def test_ignored(self):
+        self.assertEqual(compiler.find_subexpressions('"len(obj)" in obj and foo.len(obj) and flen(obj)'), [])
+
+    def test_invalid(self):
+        self.assertEqual(compiler.find_subexpressions('len(obj'), [])
+
+
+class MakeCheckTestCase(unittest.TestCase):
+    def test_conjunction(self):
+        check = compiler.make_check(['len(obj) > 1', 'len(obj) < 3'], True, {})
+        self.assertEqual([check(obj) for obj in ('a', 'ab', 'abc')], [False, True, False])
+
+    def test_disjunction(self):
+        check = compiler.make_check(['obj.upper() == "A"', 'obj.upper() == "B"'], False, {})
+        self.assertEqual([check(obj) for obj in ('a', 'b', 'c')], [True, True, False])
+
+    def test_lazy(self):
+        check = compiler.make_check(['obj is not None', 'len(obj) > 1', 'len(obj) < 3'], True, {})
+        self.assertFalse(check(None))
+
+    def test_guarded(self):
+        operands = ['obj.is_integer() and int(obj) % 2 != 0', 'obj.is_integer() and int(obj) % 2 == 0']
+        self.assertIsNone(compiler.make_check(operands, False, {}))
+        self.assertIsNone(compiler.make_check(['0 < obj < len(obj)', '(len(obj) if obj else 0) > 1'], False, {}))
+        check = compiler.make_check(['obj < 100 and int(obj) > 1', 'int(obj) < 5', 'int(obj) != 4'], True, {})
+        self.assertEqual([check(obj) for obj in (float('inf'), 0.5, 3.0, 4.0)], [False, False, True, False])
+
+    def test_guarded_by_commands(self):
+        filtr = (datatypes.float.isinteger() & datatypes.float.isodd()) | \
+            (datatypes.float.isinteger() & datatypes.float.iseven())
+        searchable = [float('inf'), float('nan'), 3.0, 0.5]
+        self.assertEqual(list(commands.find(filtr, optimize=False).inside(searchable)), [3.0])
+        self.assertEqual(list(commands.find(filtr).inside(searchable)), [3.0])
+
+    def test_nothing_common(self):
+        self.assertIsNone(compiler.make_check(['len(obj) > 1', 'obj.upper() == "A"'], True, {}))
+
+    def test_shared_by_commands(self):
+        filtr = datatypes.string.icontains('a') | datatypes.string.icontains('b') | datatypes.string.istartswith('c')
+        command = commands.find(filtr)
+        self.assertTrue(command.raw_condition.startswith('isinstance(obj, ('))
+        self.assertTrue(command.raw_condition.endswith(',)) and _check(obj)'))
+        self.assertEqual(list(command.inside(['xA', 'bb', 'Cz', 'zz', b'AB', 1])), ['xA', 'bb', 'Cz', b'AB'])
+        self.assertIs(commands.find(filtr).traversal, command.traversal)
@@ -68,6 +68,14 @@ class DatatypesTestCase(unittest.TestCase):
         self.assertEqual(datatypes.string.endswith.datatype, datatypes.string)
         self.assertIsInstance(datatypes.string.iendswith, filters.AugmentedFilter)
         self.assertEqual(datatypes.string.iendswith.datatype, datatypes.string)
+        self.assertIsInstance(datatypes.string.contains_any, filters.Filter)
+        self.assertEqual(datatypes.string.contains_any.datatype, datatypes.string)
+        self.assertIsInstance(datatypes.string.icontains_any, filters.Filter)
+        self.assertEqual(datatypes.string.icontains_any.datatype, datatypes.string)
+        self.assertIsInstance(datatypes.string.regex, filters.Filter)
+        self.assertEqual(datatypes.string.regex.datatype, datatypes.string)
+        self.assertIsInstance(datatypes.string.iregex, filters.Filter)
+        self.assertEqual(datatypes.string.iregex.datatype, datatypes.string)
         self.assertIsInstance(datatypes.string.len, filters.Filter)
         self.assertEqual(datatypes.string.len.datatype, datatypes.string)
         self.assertIsInstance(datatypes.string.lenlt, filters.Filter)
@@ -1,5 +1,6 @@
 from . import unittest
 from instructions import filters, datatypes, exceptions
+from instructions.compat import unicode
 
 
 class FilterTestCase(unittest.TestCase):
@@ -28,6 +29,30 @@ class FilterTestCase(unittest.TestCase):
     def test_not(self):
         self.assertEqual((~self.filter1).condition, 'not 1 == 1')
 
+    def test_immutable(self):
+        filtr = filters.Filter('{0} == 1')
+        self.assertIsNot(filtr(1), filtr)
+        self.assertEqual(filtr.condition, '{0} == 1')
+        self.assertIsNot(~self.filter1, self.filter1)
+        self.assertEqual(self.filter1.condition, '1 == 1')
+
+    def test_immutable_errors(self):
+        def setattr_():
+            self.filter1.condition = '2 == 2'
+
+        def delattr_():
+            del self.filter1.condition
+
+        self.assertRaises(exceptions.FilterImmutableError, setattr_)
+        self.assertRaises(exceptions.FilterImmutableError, delattr_)
+        self.assertRaises(AttributeError, setattr_)
+
+    def test_datatype_filters_shared(self):
+        foo, bar = datatypes.string.contains('foo'), datatypes.string.contains('bar')
+        self.assertNotEqual(foo.condition, bar.condition)
+        self.assertIs(foo.datatype, datatypes.string)
+        self.assertEqual(datatypes.string.contains.condition, datatypes.string.contains.raw_condition)
+
     def test_str(self):
         self.assertEqual(str(self.filter1), '1 == 1')
 
@@ -35,6 +60,33 @@ class FilterTestCase(unittest.TestCase):
         self.assertEqual(repr(self.filter1), '<instructions.filters.Filter "1 == 1">')
 
 
+class ArgumentTestCase(unittest.TestCase):
+    def test_format(self):
+        self.assertEqual('{0} {0.upper}'.format(filters.Argument('foo')), "'foo' 'FOO'")
+
+    def test_encoded(self):
+        self.assertEqual(filters.Argument(b'caf\xc3\xa9'.decode('utf-8')).encoded.value, b'caf\xc3\xa9')
+        self.assertEqual(filters.Argument(b'foo').encoded.value, b'foo')
+
+    def test_decoded(self):
+        self.assertEqual(filters.Argument(b'caf\xc3\xa9').decoded.value, b'caf\xc3\xa9'.decode('utf-8'))
+        self.assertEqual(filters.Argument(b'\xff').decoded.value, b'\xff')
+        self.assertEqual(filters.Argument('foo').decoded.value, 'foo')
+
+    def test_augment(self):
+        self.assertEqual(filters.augment('{0.upper} in obj and {1}', '({0.encoded} or {0})'),
+                         '({0.upper.encoded} or {0.upper}) in obj and {1}')
+
+    def test_hoisted(self):
+        condition = datatypes.string.icontains('foo').condition
+        expected = '({0!r} if isinstance(obj, (bytes, bytearray)) else {1!r}) in obj.upper()'
+        expected = expected.format(b'FOO', unicode('FOO'))
+        self.assertEqual(condition, expected)
+
+    def test_arguments_amount(self):
+        self.assertRaises(exceptions.FilterUsageError, lambda: filters.Filter('{0.upper} in {1}')('foo'))
+
+
 class AugmentedFilterTestCase(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -0,0 +1,54 @@
+import collections
+
+from . import unittest
+from instructions import Index, commands, datatypes
+
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.searchable = [
+            1, 'foo', 2.5, True, [2, 'bar', {'baz': 3, 'qux': ['quux', (4,)], (5, 'k'): {'x': 6}}],
+            (7, ['corge']), set([8]), {'grault': {'garply': 9}}
+        ]
+        self.index = Index(self.searchable)
+
+    def assertSameResults(self, command):
+        expected = command.inside(self.searchable)
+        result = command.inside(self.index)
+
+        if isinstance(expected, collections.Iterator):
+            self.assertEqual(list(result), list(expected))
+        else:
+            self.assertEqual(result, expected)
+
+    def test_datatypes(self):
+        for datatype in (datatypes.int, datatypes.numeric, datatypes.string, datatypes.bool, datatypes.iterable,
+                         datatypes.list, datatypes.tuple, datatypes.dict, datatypes.set):
+            self.assertSameResults(commands.find(datatype))
+
+    def test_filters(self):
+        self.assertSameResults(commands.find(datatypes.numeric.gt(2)))
+        self.assertSameResults(commands.find(datatypes.string.contains('u')))
+        self.assertSameResults(commands.find(datatypes.dict.contains_key('x')))
+
+    def test_options(self):
+        for options in ({'level': 1}, {'level': 2}, {'level': 3}, {'ignore': [tuple]}, {'ignore': [dict, set]},
+                        {'indict': 'keys'}, {'indict': 'keys', 'level': 2}, {'limit': 2}, {'dedupe': True}):
+            self.assertSameResults(commands.find(datatypes.int, **options))
+            self.assertSameResults(commands.find(datatypes.string, **options))
+            self.assertSameResults(commands.find(datatypes.iterable, **options))
+            self.assertSameResults(commands.find(datatypes.dict, **options))
+
+    def test_commands(self):
+        self.assertSameResults(commands.first(datatypes.string))
+        self.assertSameResults(commands.last(datatypes.string))
+        self.assertSameResults(commands.exists(datatypes.complex))
+        self.assertSameResults(commands.count(datatypes.numeric))
+
+    def test_buckets(self):
+        self.assertEqual(sorted(obj for _, _, _, obj in self.index.buckets[int]), [1, 2, 3, 4, 5, 6, 7, 8, 9])
+
+    def test_iteration(self):
+        self.assertEqual(list(self.index), self.searchable)
+        self.assertEqual(list(commands.batch([commands.find(datatypes.int)]).inside(self.index)[0]),
+                         list(commands.find(datatypes.int).inside(self.searchable)))
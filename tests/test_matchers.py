@@ -0,0 +1,166 @@
+import re
+import sys
+import mmap
+import pickle
+import tempfile
+
+from . import unittest
+from instructions import compat, matchers, filters, exceptions
+
+
+class AutomatonTestCase(unittest.TestCase):
+    def setUp(self):
+        self.automaton = matchers.Automaton(['he', 'she', 'his', 'hers'])
+
+    def test_text(self):
+        self.assertTrue(self.automaton('ushers'))
+        self.assertTrue(self.automaton('this'))
+        self.assertFalse(self.automaton('hi sh'))
+        self.assertFalse(self.automaton(''))
+
+    def test_bytes(self):
+        self.assertTrue(self.automaton(b'ushers'))
+        self.assertTrue(self.automaton(bytearray(b'this')))
+        self.assertFalse(self.automaton(b'hi sh'))
+
+    def test_failure_links(self):
+        automaton = matchers.Automaton(['abcd', 'bce'])
+        self.assertTrue(automaton('abce'))
+        self.assertFalse(automaton('abcbd'))
+
+    def test_mixed_patterns(self):
+        automaton = matchers.Automaton([b'caf\xc3\xa9', b'\xff'])
+        self.assertTrue(automaton(b'un caf\xc3\xa9'.decode('utf-8')))
+        self.assertTrue(automaton(b'\xff'))
+        self.assertFalse(automaton(b'\xc3\xbf'.decode('utf-8')))
+
+    def test_empty(self):
+        self.assertFalse(matchers.Automaton([])('foo'))
+        self.assertTrue(matchers.Automaton([''])(''))
+
+    def test_shared(self):
+        self.assertIs(matchers.get_automaton(['foo', 'bar']), matchers.get_automaton(('foo', 'bar')))
+        self.assertIsNot(matchers.get_automaton([compat.unicode('foo')]), matchers.get_automaton([b'foo']))
+
+
+class ContainsAnyTestCase(unittest.TestCase):
+    def test_names(self):
+        filtr = filters.Filter('{0.automaton}(obj)')(['foo'])
+        self.assertEqual(list(filtr.names.values()), [matchers.get_automaton(['foo'])])
+        self.assertEqual(filtr.condition, '{0}(obj)'.format(list(filtr.names)[0]))
+
+    def test_usage_error(self):
+        self.assertRaises(exceptions.FilterUsageError, lambda: filters.Filter('{0.automaton}(obj)')([1]))
+
+
+class RegexTestCase(unittest.TestCase):
+    def test_modes(self):
+        self.assertTrue(matchers.Regex('o+')('foo'))
+        self.assertFalse(matchers.Regex('o+', mode='match')('foo'))
+        self.assertTrue(matchers.Regex('fo', mode='match')('foo'))
+        self.assertFalse(matchers.Regex('fo|foo', mode='fullmatch')('fooo'))
+        self.assertTrue(matchers.Regex('fo|foo', mode='fullmatch')('foo'))
+
+    def test_bytes(self):
+        regex = matchers.Regex(b'caf\xc3\xa9'.decode('utf-8'))
+        self.assertTrue(regex(b'un caf\xc3\xa9'))
+        self.assertTrue(regex(bytearray(b'caf\xc3\xa9')))
+        self.assertTrue(matchers.Regex(b'caf\xc3\xa9')(b'caf\xc3\xa9'.decode('utf-8')))
+        self.assertFalse(matchers.Regex(b'\xff')(b'\xc3\xbf'.decode('utf-8')))
+
+    def test_compiled(self):
+        regex = matchers.Regex(re.compile('FOO', re.IGNORECASE))
+        self.assertTrue(regex('foo'))
+        self.assertTrue(regex(b'foo'))
+
+    def test_flags(self):
+        self.assertTrue(matchers.Regex('FOO', flags=re.IGNORECASE)(b'foo'))
+
+    def test_invalid_variant(self):
+        regex = matchers.Regex(compat.unicode('(?u)a'))
+        self.assertTrue(regex(compat.unicode('a')))
+        self.assertIsNotNone(regex.text)
+
+    @unittest.skipIf(sys.version_info < (3, 8), 'named unicode escapes are not supported by re')
+    def test_named_escape(self):
+        regex = matchers.Regex(r'caf\N{LATIN SMALL LETTER E WITH ACUTE}')
+        self.assertTrue(regex(b'caf\xc3\xa9'.decode('utf-8')))
+        self.assertIsNone(regex.data)
+        self.assertFalse(regex(b'caf\xc3\xa9'))
+
+    @unittest.skipIf(compat.py2, 'ASCII flag is not supported on Python 2')
+    def test_ascii(self):
+        regex = matchers.Regex(re.compile(r'\w+', re.ASCII), mode='fullmatch')
+        self.assertTrue(regex('foo'))
+        self.assertFalse(regex(b'caf\xc3\xa9'.decode('utf-8')))
+        self.assertTrue(regex(b'foo'))
+
+    def test_shared(self):
+        self.assertIs(matchers.get_regex('foo'), matchers.get_regex('foo'))
+        self.assertIsNot(matchers.get_regex('foo'), matchers.get_regex('foo', mode='match'))
+        self.assertIs(matchers.compile_pattern('foo'), matchers.compile_pattern('foo'))
+
+    def test_pickle(self):
+        self.assertTrue(pickle.loads(pickle.dumps(matchers.Regex('o', mode='match')))('oo'))
+
+
+class RegexFilterTestCase(unittest.TestCase):
+    def test_usage_errors(self):
+        self.assertRaises(exceptions.FilterUsageError, lambda: filters.Filter('{0.regex}(obj)')('('))
+        self.assertRaises(exceptions.FilterUsageError, lambda: filters.Filter('{0.regex}(obj)')('a', mode='foo'))
+
+    def test_invalid_variant(self):
+        self.assertTrue(filters.Filter('{0.regex}(obj)')(compat.unicode('(?u)a')))
+
+
+class LocatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.file = tempfile.TemporaryFile()
+        self.file.write(b'xxabyyabzzab')
+        self.file.flush()
+        self.mmap = mmap.mmap(self.file.fileno(), 0)
+
+    def tearDown(self):
+        self.mmap.close()
+        self.file.close()
+
+    def test_contains(self):
+        locator = matchers.Locator(b'ab')
+        self.assertEqual(list(locator(b'abab')), [0, 2])
+        self.assertEqual(list(locator(bytearray(b'cab'))), [1])
+        self.assertEqual(list(locator(memoryview(b'ab-ab'))), [0, 3])
+        self.assertEqual(list(locator(self.mmap)), [2, 6, 10])
+        self.assertEqual(list(locator('tab')), [1])
+        self.assertEqual(list(locator(b'aaa')), [])
+
+    def test_overlapping(self):
+        self.assertEqual(list(matchers.Locator(b'aa')(b'aaaa')), [0, 2])
+        self.assertEqual(list(matchers.Locator(b'aa')(memoryview(b'aaaa'))), [0, 2])
+        self.assertEqual(list(matchers.Locator(b'')(b'ab')), [0, 1, 2])
+        self.assertEqual(list(matchers.Locator(b'')(memoryview(b'ab'))), [0, 1, 2])
+
+    def test_locations(self):
+        for location, expected in (('startswith', [0]), ('endswith', [3]), ('exact', [])):
+            locator = matchers.Locator(b'ab', location)
+            self.assertEqual(list(locator(b'ab-ab')), expected)
+            self.assertEqual(list(locator(memoryview(b'ab-ab'))), expected)
+
+        self.assertEqual(list(matchers.Locator(b'ab', 'exact')(memoryview(b'ab'))), [0])
+        self.assertEqual(list(matchers.Locator(b'xxabyyabzzab', 'exact')(self.mmap)), [0])
+        self.assertEqual(list(matchers.Locator(b'zab', 'endswith')(self.mmap)), [9])
+        self.assertEqual(list(matchers.Locator(b'abc', 'endswith')(b'bc')), [])
+
+    def test_text(self):
+        acute = b'\xc3\xa9'.decode('utf-8')
+        self.assertEqual(list(matchers.Locator(acute)(b'caf\xc3\xa9 \xc3\xa9'.decode('utf-8'))), [3, 5])
+        self.assertEqual(list(matchers.Locator(acute)(b'caf\xc3\xa9')), [3])
+        self.assertEqual(list(matchers.Locator(b'\xff')(b'\xc3\xbf'.decode('utf-8'))), [])
+
+    def test_count(self):
+        locator = matchers.Locator(b'ab')
+        self.assertEqual(locator.count(b'abab'), 2)
+        self.assertEqual(locator.count(self.mmap), 3)
+        self.assertEqual(matchers.Locator(b'ab', 'startswith').count(b'abab'), 1)
+
+    def test_pickle(self):
+        self.assertEqual(list(pickle.loads(pickle.dumps(matchers.Locator(b'a', 'endswith')))(b'aa')), [1])
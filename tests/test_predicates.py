@@ -0,0 +1,196 @@
+import pickle
+
+from . import unittest
+from instructions import predicates, filters, commands, compiler, datatypes, exceptions
+
+
+class PrecedenceTestCase(unittest.TestCase):
+    def test_atom(self):
+        self.assertEqual(predicates.get_precedence('obj == 1'), predicates.ATOM)
+
+    def test_operators(self):
+        self.assertEqual(predicates.get_precedence('obj or 1'), predicates.OR)
+        self.assertEqual(predicates.get_precedence('obj and 1'), predicates.AND)
+        self.assertEqual(predicates.get_precedence('not obj'), predicates.NOT)
+        self.assertEqual(predicates.get_precedence('1 if obj else 2'), predicates.LOWEST)
+
+    def test_invalid(self):
+        self.assertEqual(predicates.get_precedence('obj =='), predicates.LOWEST)
+
+
+class CostTestCase(unittest.TestCase):
+    def test_estimation(self):
+        self.assertLess(predicates.get_cost('len(obj) == 5'), predicates.get_cost('obj.upper() == "FOO"'))
+        self.assertLess(predicates.get_cost('obj.upper() == "FOO"'), predicates.get_cost('any(i in obj for i in x)'))
+
+    def test_explicit(self):
+        self.assertEqual(predicates.Leaf('any(i in obj for i in x)', cost=1).estimate(), 1)
+        self.assertEqual(filters.Filter('obj', cost=5).tree.estimate(), 5)
+
+    def test_guard(self):
+        leaf = datatypes.int.gt(1).tree
+        self.assertGreater(leaf.estimate(), leaf.estimate(datatypes.int))
+
+
+class ReorderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.expensive = datatypes.iterable.contains_any(['foo']).tree
+        self.cheap = datatypes.iterable.len(1).tree
+
+    def test_reorder(self):
+        tree = predicates.reorder(predicates.And.combine(self.expensive, self.cheap), datatypes.iterable)
+        self.assertEqual(tree.children, (self.cheap, self.expensive))
+        tree = predicates.reorder(predicates.Not(predicates.Or.combine(self.expensive, self.cheap)))
+        self.assertEqual(tree.child.children, (self.cheap, self.expensive))
+
+    def test_stable(self):
+        tree = predicates.And.combine(self.cheap, datatypes.iterable.len(2).tree)
+        self.assertEqual(predicates.reorder(tree), tree)
+
+    def test_unmovable(self):
+        first, second = predicates.Leaf('hasattr(obj, "foo")'), predicates.Leaf('obj.foo > 1')
+        tree = predicates.And.combine(self.expensive, first, self.cheap, second)
+        self.assertEqual(predicates.reorder(tree).children, (self.expensive, first, self.cheap, second))
+        tree = predicates.And.combine(predicates.Leaf('any(obj)', cost=10), predicates.Leaf('obj', cost=1))
+        self.assertEqual(predicates.reorder(tree).render(), 'obj and any(obj)')
+
+
+class StatisticsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.statistics = predicates.Statistics(maxsize=2)
+        self.leaf = predicates.Leaf('obj == 1')
+
+    def test_update(self):
+        self.statistics.update(self.leaf, 10, 2)
+        self.statistics.update(self.leaf, 10, 0)
+        self.assertEqual(self.statistics.get(self.leaf), (20, 2))
+        self.assertAlmostEqual(self.statistics.selectivity(self.leaf), 3.0 / 22)
+
+    def test_unseen(self):
+        self.assertEqual(self.statistics.selectivity(self.leaf), 0.5)
+
+    def test_eviction(self):
+        self.statistics.update(self.leaf, 1, 1)
+        self.statistics.update(predicates.Leaf('obj == 2'), 1, 1)
+        self.statistics.update(predicates.Leaf('obj == 3'), 1, 1)
+        self.assertEqual(self.statistics.get(self.leaf), (0, 0))
+
+    def test_rank(self):
+        cheap, expensive = predicates.Leaf('obj', cost=1), predicates.Leaf('obj', cost=4)
+        self.statistics.update(cheap, 100, 100)
+        self.statistics.update(expensive, 100, 0)
+        children = predicates.order(predicates.And, [cheap, expensive], statistics=self.statistics)
+        self.assertEqual(children, [expensive, cheap])
+        children = predicates.order(predicates.Or, [cheap, expensive], statistics=self.statistics)
+        self.assertEqual(children, [cheap, expensive])
+
+
+class ProbeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.statistics = predicates.Statistics()
+        self.always = predicates.Leaf('obj > 0', cost=1)
+        self.never = predicates.Leaf('obj < 0', cost=2)
+
+    def test_results(self):
+        probe = predicates.Probe(predicates.And.combine(self.always, self.never), statistics=self.statistics)
+        self.assertFalse(probe(1))
+        probe = predicates.Probe(predicates.Or.combine(self.never, self.always), statistics=self.statistics)
+        self.assertTrue(probe(1))
+        self.assertFalse(probe(-1) and probe(0))
+
+    def test_adaptation(self):
+        probe = predicates.Probe(predicates.And.combine(self.always, self.never), statistics=self.statistics)
+        probe.interval = 10
+
+        for number in range(1, 12):
+            self.assertFalse(probe(number))
+
+        self.assertEqual(self.statistics.get(self.always), (10, 10))
+        self.assertEqual(self.statistics.get(self.never), (10, 0))
+        self.assertEqual([operand[0] for operand in probe.operands], [self.never, self.always])
+
+
+class TreeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.leaf1 = predicates.Leaf('obj == 1')
+        self.leaf2 = predicates.Leaf('obj == 2')
+        self.leaf3 = predicates.Leaf('obj == 3 or obj == 4')
+
+    def test_render(self):
+        self.assertEqual(predicates.And.combine(self.leaf1, self.leaf2).render(), 'obj == 1 and obj == 2')
+        self.assertEqual(predicates.Or.combine(self.leaf1, self.leaf2).render(), 'obj == 1 or obj == 2')
+        self.assertEqual(predicates.Not(self.leaf1).render(), 'not obj == 1')
+
+    def test_parentheses(self):
+        tree = predicates.And.combine(self.leaf1, predicates.Or.combine(self.leaf2, self.leaf1))
+        self.assertEqual(tree.render(), 'obj == 1 and (obj == 2 or obj == 1)')
+        self.assertEqual(predicates.And.combine(self.leaf1, self.leaf3).render(), 'obj == 1 and (obj == 3 or obj == 4)')
+        self.assertEqual(predicates.Not(self.leaf3).render(), 'not (obj == 3 or obj == 4)')
+
+    def test_flatten(self):
+        tree = predicates.And.combine(predicates.And.combine(self.leaf1, self.leaf2), self.leaf3)
+        self.assertEqual(tree.children, (self.leaf1, self.leaf2, self.leaf3))
+
+    def test_dedupe(self):
+        self.assertEqual(predicates.Or.combine(self.leaf1, self.leaf1), self.leaf1)
+        self.assertEqual(predicates.And.combine(self.leaf1, self.leaf2, self.leaf1).children, (self.leaf1, self.leaf2))
+
+    def test_names(self):
+        self.assertEqual(predicates.Leaf('obj in x', {'x': [1]}), predicates.Leaf('obj in x', {'x': [1]}))
+        self.assertNotEqual(predicates.Leaf('obj in x', {'x': [1]}), predicates.Leaf('obj in x', {'x': [2]}))
+        self.assertNotEqual(predicates.Leaf('obj is x', {'x': 1}), predicates.Leaf('obj is x', {'x': True}))
+        self.assertNotEqual(predicates.Leaf('obj in x', {'x': [1]}), predicates.Leaf('obj in x', {'y': [1]}))
+        tree = predicates.And.combine(predicates.Leaf('obj in x', {'x': [1]}), predicates.Leaf('obj in x', {'x': [2]}))
+        self.assertEqual(len(tree.children), 2)
+        self.assertRaises(exceptions.FilterUsageError, tree.namespace)
+
+    def test_datatype(self):
+        string, integer = datatypes.string.contains('a').tree, datatypes.int.gt(1).tree
+        self.assertIs(predicates.Not(predicates.And.combine(string, string)).datatype, datatypes.string)
+        self.assertIsNone(predicates.Or.combine(string, integer).datatype)
+        self.assertIsNone(predicates.Or.combine(string, self.leaf1).datatype)
+
+    def test_guard(self):
+        leaf = datatypes.string.len(1).tree
+        self.assertEqual(leaf.render(datatypes.string), 'len(obj) == 1')
+        self.assertEqual(leaf.render(), datatypes.string.condition + ' and len(obj) == 1')
+        self.assertEqual(leaf.namespace(), datatypes.string.names)
+        self.assertEqual(leaf.namespace(datatypes.string), {})
+
+    def test_gate_guard(self):
+        leaf = datatypes.int.gt(1).tree
+        self.assertEqual(leaf.render(datatypes.int), 'obj > 1')
+        self.assertEqual(leaf.render(), '_IntType_gate[type(obj)] and obj > 1')
+        self.assertEqual(leaf.namespace(), {'_IntType_gate': compiler.get_gate(datatypes.int)})
+        self.assertEqual(leaf.namespace(datatypes.int), {})
+
+    def test_pickle(self):
+        tree = predicates.Or.combine(predicates.Not(self.leaf1), datatypes.int.gt(1).tree)
+        self.assertEqual(pickle.loads(pickle.dumps(tree)), tree)
+
+
+class CombinedFilterTestCase(unittest.TestCase):
+    def test_same_datatype(self):
+        filtr = datatypes.string.startswith('foo') & ~datatypes.string.endswith('bar')
+        self.assertIs(filtr.datatype, datatypes.string)
+        self.assertEqual(list(commands.find(filtr).inside(['foobar', 'foobaz', 1, ['foo']])), ['foobaz', 'foo'])
+
+    def test_different_datatypes(self):
+        filtr = datatypes.string.contains('a') | datatypes.int.gt(3)
+        self.assertIsNone(filtr.datatype)
+        self.assertEqual(list(commands.find(filtr).inside(['a', 5, 2, 'b', [1], True])), ['a', 5])
+
+    def test_names(self):
+        filtr = datatypes.iterable.str_contains_str('x') & datatypes.list.len(1)
+        self.assertEqual(list(commands.find(filtr).inside([['x'], ('x',), 'x', 1])), [['x']])
+
+    def test_conflicting_names(self):
+        with self.assertRaises(exceptions.FilterUsageError):
+            filters.Filter('obj in x', {'x': [1]}) & filters.Filter('obj in x', {'x': [2]})
+
+        filtr = filters.Filter('obj in x', {'x': [1]}) & filters.Filter('obj > y', {'x': [1], 'y': 0})
+        self.assertEqual(list(commands.find(filtr).inside([1, 2])), [1])
+
+    def test_precedence(self):
+        filtr = filters.Filter('obj == 1 or obj == 2') & datatypes.int.gt(1)
+        self.assertEqual(list(commands.find(filtr).inside([1, 2, 3])), [2])
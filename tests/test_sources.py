@@ -0,0 +1,137 @@
+import io
+import json
+import mmap
+import tempfile
+
+from . import unittest
+from instructions import commands, datatypes, exceptions, sources
+from instructions.compat import load, unicode, py3
+
+futures = load('concurrent.futures')
+
+
+class CountingIO(io.BytesIO):
+    def __init__(self, *args, **kwargs):
+        super(CountingIO, self).__init__(*args, **kwargs)
+        self.reads = 0
+
+    def read(self, *args, **kwargs):
+        self.reads += 1
+        return super(CountingIO, self).read(*args, **kwargs)
+
+
+class JSONStreamTestCase(unittest.TestCase):
+    def setUp(self):
+        self.items = [{'foo': b'caf\xc3\xa9 '.decode('utf-8') * 20, 'bar': 1234567}, [1, 2.5e10, None, True],
+                      'x' * 100, -98765, {}]
+        self.document = unicode(json.dumps(self.items))
+
+    def test_array(self):
+        for chunksize in (1, 2, 3, 7, 65536):
+            self.assertEqual(list(sources.json_stream(io.StringIO(self.document), chunksize)), self.items)
+            self.assertEqual(list(sources.json_stream(io.BytesIO(self.document.encode('utf-8')), chunksize)),
+                             self.items)
+
+        document = unicode('[1234567, 2.5e10, 3.25, -1.5e-3, 1E+2, 0.0001]')
+
+        for chunksize in range(1, 12):
+            self.assertEqual(list(sources.json_stream(io.StringIO(document), chunksize)), json.loads(document))
+            self.assertEqual(list(sources.json_stream(io.StringIO(unicode('-2.5e3 ')), chunksize)), [-2500.0])
+
+        numbers = [number * 1.0001 for number in range(2000)]
+        self.assertEqual(list(sources.json_stream(io.StringIO(unicode(json.dumps(numbers))), 64)), numbers)
+
+    def test_object(self):
+        document = io.StringIO(unicode('{"a": 1, "b": [2, 3], "c": {"d": "e"}}'))
+        self.assertEqual(list(sources.json_stream(document, 2)), [1, [2, 3], {'d': 'e'}])
+
+    def test_scalar_and_empty(self):
+        self.assertEqual(list(sources.json_stream(io.StringIO(unicode(' 42 ')), 1)), [42])
+        self.assertEqual(list(sources.json_stream(io.StringIO(unicode('[ ]')))), [])
+        self.assertEqual(list(sources.json_stream(io.StringIO(unicode('{}')))), [])
+
+    def test_decoder(self):
+        decoder = json.JSONDecoder(object_hook=lambda obj: sorted(obj))
+        document = io.StringIO(unicode('[{"b": 1, "a": 2}]'))
+        self.assertEqual(list(sources.json_stream(document, decoder=decoder)), [['a', 'b']])
+
+    def test_errors(self):
+        for document, position in (('', 0), ('[1,', 3), ('[1 2]', 3), ('{"a" 1}', 5), ('[1]x', 3), ('[1,]', 3)):
+            with self.assertRaises(exceptions.SourceDecodeError) as context:
+                list(sources.json_stream(io.StringIO(unicode(document)), 2))
+
+            self.assertIn('position {0}'.format(position), str(context.exception))
+
+    def test_search(self):
+        document = json.dumps([{'id': i, 'tags': ['t{0}'.format(i)]} for i in range(10000)]).encode('utf-8')
+        fileobj = CountingIO(document)
+        self.assertEqual(commands.first(datatypes.string.exact('t5')).inside(sources.json_stream(fileobj, 1024)), 't5')
+        self.assertEqual(fileobj.reads, 1)
+        self.assertFalse(commands.exists(datatypes.float).inside(sources.json_stream(io.BytesIO(document))))
+        self.assertEqual(commands.count(datatypes.int.gte(9990)).inside(sources.json_stream(io.BytesIO(document))), 10)
+        self.assertEqual(list(commands.find(datatypes.int.gt(9998)).inside(sources.json_stream(io.BytesIO(document)))),
+                         [9999])
+
+
+class JSONLinesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.lines = [{'level': 'info', 'message': 'started'}, [1, 'foobar'], 'food', None, {'errors': ['foo']}]
+        self.document = unicode('\n'.join(json.dumps(line) for line in self.lines[:2]) + '\n\n' +
+                                '\n'.join(json.dumps(line) for line in self.lines[2:]) + '\n')
+
+    def test_iteration(self):
+        self.assertEqual(list(sources.json_lines(io.StringIO(self.document))), self.lines)
+        self.assertEqual(list(sources.json_lines(io.BytesIO(self.document.encode('utf-8')), 2)), self.lines)
+        self.assertEqual(list(sources.json_lines(io.StringIO(unicode('')))), [])
+
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as fileobj:
+            fileobj.write(self.document.encode('utf-8'))
+            fileobj.flush()
+            source = mmap.mmap(fileobj.fileno(), 0)
+
+            try:
+                self.assertEqual(commands.count(datatypes.string).inside(sources.json_lines(source)), 5)
+            finally:
+                source.close()
+
+    def test_search(self):
+        command = commands.find(datatypes.string.startswith('foo'))
+
+        for batchsize in (1, 2, 1000):
+            self.assertEqual(list(sources.json_lines(io.StringIO(self.document), batchsize).search(command)),
+                             [(2, 'foobar'), (4, 'food'), (6, 'foo')])
+
+        command = commands.first(datatypes.string.contains('o'), offsets=True)
+        self.assertEqual(list(sources.json_lines(io.StringIO(self.document)).search(command)), [(1, ('info', 3))])
+
+    @unittest.skipIf(futures is None, 'concurrent.futures is not available')
+    def test_executor(self):
+        document = io.StringIO(self.document * 100)
+        command = commands.find(datatypes.string.exact('foo'))
+
+        with futures.ThreadPoolExecutor(2) as executor:
+            found = list(sources.json_lines(document, 7, executor).search(command))
+
+        self.assertEqual(found, [(6 * i + 6, 'foo') for i in range(100)])
+
+    def test_errors(self):
+        with self.assertRaises(exceptions.SourceDecodeError) as context:
+            list(sources.json_lines(io.StringIO(unicode('1\n\n[2,\n'))))
+
+        # Errors of Python 2's json don't tell where inside the line they are
+        self.assertIn('line 3', str(context.exception))
+        self.assertIn('position {0}'.format(7 if py3 else 3), str(context.exception))
+
+        with self.assertRaises(exceptions.SourceDecodeError) as context:
+            list(sources.json_lines(io.BytesIO(b'1\n"a\xff"\n')))
+
+        self.assertIn('line 2', str(context.exception))
+        self.assertIn('position 4', str(context.exception))
+
+        # Positions inside bytes sources count bytes, not characters of decoded lines
+        with self.assertRaises(exceptions.SourceDecodeError) as context:
+            list(sources.json_lines(io.BytesIO(b'1\n"caf\xc3\xa9" 2\n')))
+
+        self.assertIn('line 2', str(context.exception))
+        self.assertIn('position {0}'.format(10 if py3 else 2), str(context.exception))
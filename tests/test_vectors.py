@@ -0,0 +1,197 @@
+import array
+
+from . import unittest
+from instructions import Index, commands, compat, compiler, datatypes, filters, vectors, exceptions
+from instructions.compat import load
+
+numpy = load('numpy')
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class VectorTestCase(unittest.TestCase):
+    def test_mask(self):
+        vector = vectors.Vector('obj > 2', {}, 'iu', vector='obj > 2')
+        self.assertEqual(vector(numpy.arange(5)).tolist(), [3, 4])
+        self.assertEqual(vector(numpy.arange(6).reshape(2, 3)).tolist(), [3, 4, 5])
+
+    def test_kinds(self):
+        vector = vectors.Vector('obj > 2', {}, 'iu', vector='obj > 2')
+        self.assertIsNone(vector(numpy.arange(5, dtype=float)))
+        self.assertIsNone(vector(numpy.array(['a', 'b'])))
+
+    def test_depth(self):
+        vector = vectors.Vector('obj > 2', {}, 'iu', vector='obj > 2')
+        self.assertIsNone(vector(numpy.arange(6).reshape(2, 3), 1))
+        self.assertEqual(vector(numpy.arange(6).reshape(2, 3), 2).tolist(), [3, 4, 5])
+
+    def test_ignore(self):
+        vector = vectors.Vector('obj > 2', {}, 'iu', [numpy.int8], 'obj > 2')
+        self.assertIsNone(vector(numpy.arange(5, dtype=numpy.int8)))
+        self.assertEqual(vector(numpy.arange(5, dtype=numpy.int16)).tolist(), [3, 4])
+
+    def test_types(self):
+        self.assertIs(vectors.Vector('obj > 2', {}, 'iu', vector='obj > 2').types, vectors.ARRAYS)
+        self.assertIs(vectors.Vector('obj > 2', {}, 'iu').types, vectors.LOOPS)
+        self.assertTrue(vectors.ARRAYS[numpy.ndarray])
+        self.assertFalse(vectors.LOOPS[numpy.ndarray])
+        self.assertTrue(vectors.LOOPS[array.array])
+        self.assertFalse(vectors.ARRAYS[list])
+
+    def test_remainder(self):
+        self.assertEqual(vectors.remainder(numpy.array([-3, 4]), 3).tolist(), [0, 1])
+        self.assertRaises(ZeroDivisionError, vectors.remainder, numpy.array([3, 4]), 0)
+        self.assertEqual(vectors.remainder(numpy.array([], dtype=int), 0).tolist(), [])
+
+    def test_integral(self):
+        self.assertEqual(vectors.integral(numpy.array([1.5, -2.5])).tolist(), [1.0, -2.0])
+        self.assertEqual(vectors.integral(numpy.array([3, -4])).tolist(), [3, -4])
+
+
+class BufferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.vector = vectors.Vector('obj > 2', {}, 'iu', vector='obj > 2')
+
+    def test_array(self):
+        self.assertEqual(self.vector(array.array('l', [1, 5, 2, 3])), [5, 3])
+        self.assertEqual(self.vector(array.array('B', [4])), [4])
+        self.assertIsNone(self.vector(array.array('d', [1.0, 5.0])))
+
+    @unittest.skipIf(compat.py2, 'items of memoryview are characters on Python 2')
+    def test_memoryview(self):
+        self.assertEqual(self.vector(memoryview(b'\x01\x05\x02')), [5])
+        self.assertEqual(self.vector(memoryview(array.array('i', [7, 1]))), [7])
+        self.assertIsNone(self.vector(memoryview(array.array('f', [7.0]))))
+        self.assertIsNone(self.vector(memoryview(b'\x01\x05\x02\x03').cast('B', (2, 2))))
+
+    def test_ignore(self):
+        self.assertIsNone(vectors.Vector('obj > 2', {}, 'iu', [int])(array.array('l', [5])))
+        self.assertEqual(vectors.Vector('obj > 2', {}, 'iu', [float])(array.array('l', [5])), [5])
+
+    def test_kind(self):
+        self.assertEqual(vectors.get_kind(array.array('h')), 'i')
+        self.assertEqual(vectors.get_kind(array.array('L')), 'u')
+        self.assertIsNone(vectors.get_kind(array.array('u')))
+
+    @unittest.skipIf(compat.py2, 'memoryview of arrays and cast() are not supported on Python 2')
+    def test_memoryview_kind(self):
+        self.assertEqual(vectors.get_kind(memoryview(array.array('d'))), 'f')
+        self.assertIsNone(vectors.get_kind(memoryview(b'ab').cast('c')))
+
+    def test_equality(self):
+        self.assertEqual(self.vector, vectors.Vector('obj > 2', {}, 'iu', vector='obj > 2'))
+        self.assertNotEqual(self.vector, vectors.Vector('obj > 2', {}, 'f', vector='obj > 2'))
+        self.assertNotEqual(self.vector, vectors.Vector('obj > 3', {}, 'iu', vector='obj > 3'))
+
+    def test_search(self):
+        searchable = [array.array('l', [1, 5, 2]), [array.array('d', [0.5, 4.5])], array.array('b', [7]), 'foo', 6]
+        self.assertEqual(list(commands.find(datatypes.int.gt(2)).inside(searchable)), [5, 7, 6])
+        self.assertEqual(list(commands.find(datatypes.numeric.gt(2)).inside(searchable)), [5, 4.5, 7, 6])
+        self.assertEqual(list(commands.find(datatypes.float).inside(searchable)), [0.5, 4.5])
+        self.assertEqual(commands.count(datatypes.numeric.isodd).inside(searchable), 3)
+        self.assertEqual(commands.count(datatypes.int.gt(1), limit=2).inside(searchable), 2)
+        self.assertEqual(list(commands.find(datatypes.int.gt(2), ignore=[int]).inside(searchable)), [])
+        self.assertEqual(list(commands.find(datatypes.int.gt(2), level=1).inside(searchable)), [6])
+
+    @unittest.skipIf(compat.py2, 'typecode "Q" is not supported on Python 2')
+    def test_search_long(self):
+        self.assertEqual(list(commands.find(datatypes.long).inside([array.array('Q', [2 ** 64 - 1])])), [2 ** 64 - 1])
+
+    @unittest.skipIf(compat.py2, 'items of memoryview are characters on Python 2')
+    def test_search_memoryview(self):
+        searchable = [memoryview(b'\x07\x01'), memoryview(array.array('d', [2.5]))]
+        self.assertEqual(list(commands.find(datatypes.int.gt(2)).inside(searchable)), [7])
+        self.assertEqual(list(commands.find(datatypes.numeric.gt(2)).inside(searchable)), [7, 2.5])
+
+
+class VectorFilterTestCase(unittest.TestCase):
+    def test_call(self):
+        self.assertEqual(datatypes.numeric.between(1, 2).vector, '(1 <= obj) & (obj <= 2)')
+        self.assertEqual(datatypes.numeric.between(1, 2).condition, '1 <= obj <= 2')
+        self.assertIsNone(datatypes.string.contains('a').vector)
+
+    def test_combined(self):
+        self.assertEqual((datatypes.int.gt(1) & ~datatypes.int.isodd).vector,
+                         '(obj > 1) & (~(_integral(obj) % 2 == 1))')
+        self.assertEqual((datatypes.int.gt(1) | datatypes.int.lt(0)).vector, '(obj > 1) | (obj < 0)')
+        self.assertIsNone((datatypes.int.gt(1) | datatypes.float.lt(0)).vector)
+        self.assertIsNone((datatypes.int.gt(1) & filters.Filter('obj')).vector)
+
+    def test_datatypes(self):
+        self.assertEqual(datatypes.int.kinds, 'iu')
+        self.assertEqual(datatypes.float.kinds, 'f')
+        self.assertEqual(datatypes.long.kinds, '')
+        self.assertEqual(datatypes.int.vector, '_whole(obj)')
+        self.assertIsNone(datatypes.string.vector)
+
+    def test_invalid(self):
+        with self.assertRaises(exceptions.FilterImplementationError):
+            filters.Filter('obj', vector=1)
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.searchable = [numpy.arange(10), 11, [numpy.array([[1.5, numpy.nan], [-3.0, 7.0]])]]
+
+    def test_find(self):
+        self.assertEqual(list(commands.find(datatypes.int.gt(7)).inside(self.searchable)), [8, 9, 11])
+        self.assertEqual(list(commands.find(datatypes.float.between(1, 8)).inside(self.searchable)), [1.5, 7.0])
+        self.assertEqual(list(commands.find(datatypes.numeric.isodd).inside(self.searchable)),
+                         [1, 3, 5, 7, 9, 11, 1.5, -3.0, 7.0])
+        filtr = datatypes.int.divisibleby(4) & ~datatypes.int.lt(1)
+        self.assertEqual(list(commands.find(filtr).inside(self.searchable)), [4, 8])
+        self.assertEqual(list(commands.find(datatypes.float).inside(self.searchable))[-1], 7.0)
+
+    def test_count(self):
+        self.assertEqual(commands.count(datatypes.numeric.gt(0)).inside(self.searchable), 12)
+        self.assertEqual(commands.count(datatypes.int.iseven).inside(self.searchable), 5)
+        self.assertEqual(commands.count(datatypes.int.iseven, limit=3).inside(self.searchable), 3)
+        self.assertEqual(commands.count(datatypes.int.gt(100)).inside(self.searchable), 0)
+
+    def test_first_and_last(self):
+        self.assertEqual(commands.first(datatypes.int.gt(3)).inside(self.searchable), 4)
+        self.assertEqual(commands.last(datatypes.numeric.lt(0)).inside(self.searchable), -3.0)
+        self.assertTrue(commands.exists(datatypes.float.isodd).inside(self.searchable))
+
+    def test_level(self):
+        self.assertEqual(list(commands.find(datatypes.float.gt(0), level=2).inside(self.searchable)), [])
+        self.assertEqual(list(commands.find(datatypes.float.gt(0), level=3).inside(self.searchable)), [])
+        self.assertEqual(list(commands.find(datatypes.float.gt(0), level=4).inside(self.searchable)), [1.5, 7.0])
+
+    def test_scalars(self):
+        searchable = [numpy.int32(3), numpy.float32(1.5), numpy.bool_(True), 4]
+        self.assertEqual(list(commands.find(datatypes.int.gt(2)).inside(searchable)), [3, 4])
+        self.assertEqual(list(commands.find(datatypes.numeric.gt(numpy.float64(1))).inside(searchable)), [3, 1.5, 4])
+
+    def test_gate(self):
+        self.assertFalse(isinstance(numpy.int32(3), datatypes.int))
+        self.assertTrue(compiler.get_gate(datatypes.int)[numpy.int32])
+        self.assertTrue(compiler.get_gate(datatypes.numeric)[numpy.uint8])
+        self.assertFalse(compiler.get_gate(datatypes.float)[numpy.int32])
+        self.assertFalse(compiler.get_gate(datatypes.numeric)[numpy.bool_])
+
+    def test_other_arrays(self):
+        searchable = [numpy.array([True, False]), numpy.array(['1', '2']), numpy.array([1 + 1j])]
+        self.assertEqual(list(commands.find(datatypes.numeric).inside(searchable)), [])
+        self.assertEqual(list(commands.find(datatypes.string).inside(searchable)), ['1', '2'])
+
+    def test_division_by_zero(self):
+        for searchable in ([numpy.array([3, 4])], [numpy.array([3.0, 4.0])], [3, 4.0]):
+            command = commands.find(datatypes.numeric.divisibleby(0))
+            self.assertRaises(ZeroDivisionError, list, command.inside(searchable))
+
+    def test_batch_and_index(self):
+        searchable = [numpy.array([1, 5, 7, 10]), [2, 8]]
+        find = commands.find(datatypes.int.gt(4))
+        self.assertEqual(list(commands.batch([find]).inside(searchable)[0]), [5, 7, 10, 8])
+        self.assertEqual(list(Index(searchable).search(find)), [5, 7, 10, 8])
+        self.assertTrue(find.predicate(numpy.int64(5)))
+
+    def test_combined_datatypes(self):
+        searchable = [numpy.array([1, 5]), [2, 'a', 'bc']]
+        find = commands.find(datatypes.int.gt(1) | datatypes.string.len(1))
+        self.assertEqual(list(find.inside(searchable)), [5, 2, 'a'])
+        self.assertEqual(list(commands.batch([find]).inside(searchable)[0]), [5, 2, 'a'])
+        self.assertEqual(list(Index(searchable).search(find)), [5, 2, 'a'])
+        find = commands.find(datatypes.float() | datatypes.string())
+        self.assertEqual(list(find.inside([numpy.array([0.5])])), [0.5])